@@ -5,6 +5,12 @@ import os
 import base64
 from datetime import datetime
 from automation import SMSTallyAutomation
+from reconciliation_store import ReconciliationStore
+from upload_cache import ParsedUploadCache
+from disk_cache import DiskFrameCache
+from sms_partition_store import SMSPartitionStore
+from gst_library import GSTLibrary
+import shutil
 from chatbot import Chatbot
 
 def create_template_files():
@@ -37,6 +43,232 @@ def create_template_files():
 # --------------------------------------------------------
 
 
+def display_results(sms_df, tally_df, stats, check_gst):
+    """Render the metric cards, result tabs and GST summary for a finished run"""
+    st.markdown("<br><br>", unsafe_allow_html=True)
+    st.markdown('<div class="card-header">Reconciliation Results</div>', unsafe_allow_html=True)
+    
+    # Metrics in cards
+    col1, col2, col3, col4 = st.columns(4, gap="medium")
+    
+    with col1:
+        st.markdown("""
+        <div class="metric-card success">
+            <div class="metric-label">Matched SMS</div>
+            <div class="metric-value">{:,}</div>
+        </div>
+        """.format(stats['matched_sms_count']), unsafe_allow_html=True)
+        
+        st.markdown("""
+        <div class="metric-card warning">
+            <div class="metric-label">Unmatched SMS</div>
+            <div class="metric-value">{:,}</div>
+        </div>
+        """.format(stats['unmatched_sms_count']), unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown("""
+        <div class="metric-card success">
+            <div class="metric-label">Matched Tally</div>
+            <div class="metric-value">{:,}</div>
+        </div>
+        """.format(stats['matched_tally_count']), unsafe_allow_html=True)
+        
+        st.markdown("""
+        <div class="metric-card warning">
+            <div class="metric-label">Unmatched Tally</div>
+            <div class="metric-value">{:,}</div>
+        </div>
+        """.format(stats['unmatched_tally_count']), unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown("""
+        <div class="metric-card info">
+            <div class="metric-label">Matched SMS Sum</div>
+            <div class="metric-value">₹{:,.0f}</div>
+        </div>
+        """.format(stats['matched_sms_sum']), unsafe_allow_html=True)
+        
+        st.markdown("""
+        <div class="metric-card">
+            <div class="metric-label">Total SMS Sum</div>
+            <div class="metric-value">₹{:,.0f}</div>
+        </div>
+        """.format(stats['total_sms_sum']), unsafe_allow_html=True)
+    
+    with col4:
+        st.markdown("""
+        <div class="metric-card info">
+            <div class="metric-label">Matched Tally Sum</div>
+            <div class="metric-value">₹{:,.0f}</div>
+        </div>
+        """.format(stats['matched_tally_sum']), unsafe_allow_html=True)
+        
+        st.markdown("""
+        <div class="metric-card">
+            <div class="metric-label">Total Tally Sum</div>
+            <div class="metric-value">₹{:,.0f}</div>
+        </div>
+        """.format(stats['total_tally_sum']), unsafe_allow_html=True)
+    
+    # Check for discrepancies
+    if abs(stats['matched_sms_sum'] - stats['matched_tally_sum']) > 0.01:
+        st.markdown("""
+        <div class="warning-alert">
+            <strong>Attention:</strong> Sum mismatch detected between matched SMS and Tally records. Please review the data.
+        </div>
+        """, unsafe_allow_html=True)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Results tabs
+    tab1, tab2 = st.tabs(["SMS Results", "Tally Results"])
+    
+    with tab1:
+        st.markdown('<div class="card-header">SMS Transaction Results</div>', unsafe_allow_html=True)
+        
+        # Counts come from stats, since a streamed run only loads a preview of the SMS rows
+        matched_count = stats['matched_sms_count']
+        unmatched_count = stats['unmatched_sms_count']
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("""
+            <div class="success-alert">
+                <strong>Matched Records:</strong> {:,}
+            </div>
+            """.format(matched_count), unsafe_allow_html=True)
+        with col2:
+            st.markdown("""
+            <div class="warning-alert">
+                <strong>Unmatched Records:</strong> {:,}
+            </div>
+            """.format(unmatched_count), unsafe_allow_html=True)
+        
+        # Display data
+        if len(sms_df) < matched_count + unmatched_count:
+            st.caption("Showing the first {:,} of {:,} SMS rows".format(len(sms_df), matched_count + unmatched_count))
+        sms_display = sms_df.copy()
+        for col in sms_display.columns:
+            if sms_display[col].dtype == 'object':
+                sms_display[col] = sms_display[col].astype(str)
+        
+        st.dataframe(sms_display, use_container_width=True, height=400)
+        
+        # Download button
+        csv = sms_df.to_csv(index=False)
+        st.download_button(
+            label="Download SMS Results",
+            data=csv,
+            file_name=f"sms_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+    
+    with tab2:
+        st.markdown('<div class="card-header">Tally Transaction Results</div>', unsafe_allow_html=True)
+        
+        matched_count = len(tally_df[tally_df['Status'] == 'Tallied'])
+        unmatched_count = len(tally_df[tally_df['Status'] == 'Not Tallied'])
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("""
+            <div class="success-alert">
+                <strong>Matched Records:</strong> {:,}
+            </div>
+            """.format(matched_count), unsafe_allow_html=True)
+        with col2:
+            st.markdown("""
+            <div class="warning-alert">
+                <strong>Unmatched Records:</strong> {:,}
+            </div>
+            """.format(unmatched_count), unsafe_allow_html=True)
+        
+        # Display data
+        tally_display = tally_df.copy()
+        for col in tally_display.columns:
+            if tally_display[col].dtype == 'object':
+                tally_display[col] = tally_display[col].astype(str)
+        
+        st.dataframe(tally_display, use_container_width=True, height=400)
+        
+        # Download button
+        csv = tally_df.to_csv(index=False)
+        st.download_button(
+            label="Download Tally Results",
+            data=csv,
+            file_name=f"tally_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+    
+    # GST summary if applicable
+    if check_gst:
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown('<div class="card-header">GST Verification Summary</div>', unsafe_allow_html=True)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if 'sms_gst_counts' in stats or 'GST Status' in sms_df.columns:
+                st.markdown("**SMS GST Status Distribution**")
+                sms_gst_counts = stats.get('sms_gst_counts')
+                if sms_gst_counts is None:
+                    sms_gst_counts = sms_df['GST Status'].value_counts()
+                st.dataframe(sms_gst_counts, use_container_width=True)
+        
+        with col2:
+            if 'GST Status' in tally_df.columns:
+                st.markdown("**Tally GST Status Distribution**")
+                tally_gst_counts = tally_df['GST Status'].value_counts()
+                st.dataframe(tally_gst_counts, use_container_width=True)
+
+
+# Unmatched items saved for the next period's run
+CARRY_FORWARD_DIR = "carry_forward"
+
+# Memory budget for parsed uploads kept across reruns
+UPLOAD_CACHE_BUDGET_MB = int(os.environ.get("UPLOAD_CACHE_BUDGET_MB", "1024"))
+
+
+@st.cache_resource
+def get_upload_cache():
+    """Parsed-upload cache shared by every rerun and session of this server"""
+    return ParsedUploadCache(max_bytes=UPLOAD_CACHE_BUDGET_MB * 1024 * 1024)
+
+
+def get_session_gst_reference(automation, gst_files):
+    """GST reference for the uploaded files, parsed once and reused by later reruns of this session"""
+    key = tuple(ParsedUploadCache.content_hash(gst_file) for gst_file in gst_files)
+    cached = st.session_state.get('gst_reference')
+    if cached is None or cached[0] != key:
+        st.session_state.gst_reference = (key, automation.load_gst_reference(gst_files))
+    return st.session_state.gst_reference[1]
+
+
+# Indexed GST periods shared by every user; admins add periods with the key below
+GST_LIBRARY_DIR = "gst_library"
+GST_LIBRARY_ADMIN_KEY = os.environ.get("GST_LIBRARY_ADMIN_KEY", "")
+
+
+@st.cache_resource
+def get_gst_library():
+    """GST library shared by every session of this server"""
+    return GSTLibrary(GST_LIBRARY_DIR)
+
+
+# Parsed workbooks kept on disk across restarts and users
+FILE_CACHE_DIR = "file_cache"
+FILE_CACHE_MAX_MB = int(os.environ.get("FILE_CACHE_MAX_MB", "2048"))
+
+
+@st.cache_resource
+def get_disk_cache():
+    """On-disk parsed-workbook cache shared by every session of this server"""
+    return DiskFrameCache(FILE_CACHE_DIR, max_bytes=FILE_CACHE_MAX_MB * 1024 * 1024)
+
+
 # Page configuration
 st.set_page_config(
     page_title="Reconciliation Suite",
@@ -485,10 +717,13 @@ if 'processing_complete' not in st.session_state:
     st.session_state.processing_complete = False
 if 'results' not in st.session_state:
     st.session_state.results = None
+if 'reconciliation_state' not in st.session_state:
+    st.session_state.reconciliation_state = None
 if "chat_open" not in st.session_state:
     st.session_state.chat_open = False
 
 chatbot = Chatbot()
+store = ReconciliationStore()
 create_template_files()
 
 # Header
@@ -520,6 +755,24 @@ with st.sidebar:
         help="Amount difference tolerance for matching"
     )
     
+    incremental_mode = st.checkbox(
+        "Incremental mode",
+        value=False,
+        help="Treat the uploads as new days added to the previous run in this session; only open items near the new dates are re-matched"
+    )
+    
+    carry_forward = st.checkbox(
+        "Carry forward open items",
+        value=False,
+        help="Match against unmatched items saved from the previous period first, then save this period's unmatched items for the next run"
+    )
+    
+    streaming_mode = st.checkbox(
+        "Streaming mode for large SMS files",
+        value=False,
+        help="Process the SMS file in chunks spilled to disk by month and match one month at a time; ignored with incremental or carry-forward mode"
+    )
+    
     st.markdown("#### GST Verification")
     check_gst = st.checkbox(
         "Enable GST verification", 
@@ -527,6 +780,61 @@ with st.sidebar:
         help="Check GST files for service claims validation"
     )
     
+    gst_period = st.selectbox(
+        "GST source",
+        options=[None] + get_gst_library().periods(),
+        format_func=lambda period: "Uploaded files" if period is None else "Library: {}".format(period),
+        help="Use a GST period prepared by an admin instead of uploading the GST files"
+    )
+    
+    gst_mode = st.selectbox(
+        "GST matching",
+        options=['amount', 'keyed'],
+        format_func=lambda mode: "Amount and year" if mode == 'amount' else "Invoice number / GSTIN",
+        help="Invoice number / GSTIN matching looks up the invoice or supplier GSTIN quoted in the claim and confirms its amount; claims without one fall back to amount and year"
+    )
+    
+    if GST_LIBRARY_ADMIN_KEY:
+        with st.expander("GST Library Admin"):
+            admin_key = st.text_input("Admin key", type="password")
+            if admin_key == GST_LIBRARY_ADMIN_KEY:
+                library_period = st.text_input("Period name", placeholder="FY 2024-25")
+                library_files = st.file_uploader(
+                    "GST files for the period",
+                    type=['xlsx', 'xls', 'xlsm', 'csv', 'parquet'],
+                    accept_multiple_files=True,
+                    key="gst_library_uploader"
+                )
+                if st.button("Save Period", disabled=not (library_period and library_files), use_container_width=True):
+                    try:
+                        library_reference = SMSTallyAutomation().load_gst_reference(library_files)
+                        if not len(library_reference):
+                            st.error("None of the files has an invoice value column")
+                        else:
+                            get_gst_library().save_period(library_period, library_reference)
+                            st.success("Saved {} with {} file(s)".format(library_period, len(library_reference)))
+                    except ValueError as e:
+                        st.error(str(e))
+    
+    st.markdown("#### Saved Runs")
+    saved_runs = store.list_runs()
+    selected_run = st.selectbox(
+        "Previous reconciliation",
+        options=saved_runs['run_id'].tolist(),
+        format_func=lambda run_id: "#{} - {}".format(
+            run_id,
+            saved_runs.loc[saved_runs['run_id'] == run_id, 'label'].iloc[0] or
+            saved_runs.loc[saved_runs['run_id'] == run_id, 'created_at'].iloc[0]
+        ),
+        help="Runs are saved automatically and can be reopened without re-processing"
+    )
+    load_button = st.button("Load Saved Run", disabled=selected_run is None, use_container_width=True)
+    
+    if st.button("Clear File Cache", use_container_width=True,
+                 help="Delete workbooks cached on disk and in memory; they are re-parsed on next upload"):
+        get_disk_cache().purge()
+        get_upload_cache().clear()
+    
     st.markdown("---")
     
     st.markdown("""
@@ -551,19 +859,20 @@ with col1:
     </div>
     """, unsafe_allow_html=True)
     
-    sms_file = st.file_uploader(
-        "Choose SMS Excel file", 
-        type=['xlsx', 'xls', 'xlsm'],
+    sms_files = st.file_uploader(
+        "Choose SMS files", 
+        type=['xlsx', 'xls', 'xlsm', 'csv', 'parquet', 'xml'],
+        accept_multiple_files=True,
         key="sms_uploader",
         label_visibility="collapsed"
     )
     
-    if sms_file:
+    if sms_files:
         st.markdown("""
         <div class="success-alert">
             File uploaded successfully: <strong>{}</strong>
         </div>
-        """.format(sms_file.name), unsafe_allow_html=True)
+        """.format(", ".join(f.name for f in sms_files)), unsafe_allow_html=True)
 
 with col2:
     st.markdown("""
@@ -573,19 +882,20 @@ with col2:
     </div>
     """, unsafe_allow_html=True)
     
-    tally_file = st.file_uploader(
-        "Choose Tally Excel file", 
-        type=['xlsx', 'xls', 'xlsm'],
+    tally_files = st.file_uploader(
+        "Choose Tally files", 
+        type=['xlsx', 'xls', 'xlsm', 'csv', 'parquet', 'xml'],
+        accept_multiple_files=True,
         key="tally_uploader",
         label_visibility="collapsed"
     )
     
-    if tally_file:
+    if tally_files:
         st.markdown("""
         <div class="success-alert">
             File uploaded successfully: <strong>{}</strong>
         </div>
-        """.format(tally_file.name), unsafe_allow_html=True)
+        """.format(", ".join(f.name for f in tally_files)), unsafe_allow_html=True)
 
 # GST files section
 st.markdown("""
@@ -597,7 +907,7 @@ st.markdown("""
 
 gst_files = st.file_uploader(
     "Choose GST Excel files", 
-    type=['xlsx', 'xls', 'xlsm'], 
+    type=['xlsx', 'xls', 'xlsm', 'csv', 'parquet'], 
     accept_multiple_files=True,
     key="gst_uploader",
     label_visibility="collapsed"
@@ -618,9 +928,28 @@ with col2:
     process_button = st.button("Start Reconciliation Process", type="primary", use_container_width=True)
 
 if process_button:
-    if sms_file and tally_file:
+    # Header-only pre-flight, so a wrong file is reported before the full parse
+    preflight = None
+    if sms_files and tally_files:
+        preflight = SMSTallyAutomation().validate_uploads({
+            'sms': sms_files,
+            'tally': tally_files,
+            'gst': gst_files if check_gst and not gst_period else [],
+        })
+    
+    if preflight and preflight['errors']:
+        st.markdown("""
+        <div class="warning-alert">
+            <strong>Upload Check Failed:</strong><br>{}
+        </div>
+        """.format("<br>".join(preflight['errors'])), unsafe_allow_html=True)
+    elif sms_files and tally_files:
+        for warning in preflight['warnings']:
+            st.markdown('<div class="info-alert">{}</div>'.format(warning), unsafe_allow_html=True)
+        
         progress_bar = st.progress(0)
         status_text = st.empty()
+        partition_store = None
         
         try:
             # Initialize automation
@@ -628,36 +957,66 @@ if process_button:
             progress_bar.progress(10)
             automation = SMSTallyAutomation(
                 tolerance_days=tolerance_days,
-                tolerance_amount=tolerance_amount
+                tolerance_amount=tolerance_amount,
+                upload_cache=get_upload_cache(),
+                disk_cache=get_disk_cache(),
+                gst_mode=gst_mode
             )
             
             # Process SMS data
             status_text.markdown('<div class="info-alert">Processing SMS data...</div>', unsafe_allow_html=True)
             progress_bar.progress(25)
-            sms_df = automation.read_excel_file(sms_file)
-            sms_df = automation.process_sms_data(sms_df)
+            use_streaming = streaming_mode and not incremental_mode and not carry_forward
+            if use_streaming:
+                partition_store = SMSPartitionStore(tempfile.mkdtemp(prefix="sms_partitions_"))
+                for sms_file in sms_files:
+                    automation.load_sms_file_streaming(sms_file, partition_store)
+            else:
+                sms_df = automation.load_sms_files(sms_files)
             
             # Process Tally data
             status_text.markdown('<div class="info-alert">Processing Tally data...</div>', unsafe_allow_html=True)
             progress_bar.progress(45)
-            tally_df = automation.read_excel_file(tally_file)
-            tally_df = automation.process_tally_data(tally_df)
+            tally_df = automation.load_tally_files(tally_files)
             
             # Match data
             status_text.markdown('<div class="info-alert">Matching transactions...</div>', unsafe_allow_html=True)
             progress_bar.progress(65)
-            sms_df, tally_df = automation.match_sms_tally_data(sms_df, tally_df)
+            if incremental_mode and st.session_state.reconciliation_state is not None:
+                state, delta = automation.reconcile_incremental(st.session_state.reconciliation_state, sms_df, tally_df)
+                sms_df, tally_df = state['sms_df'], state['tally_df']
+            elif use_streaming:
+                tally_df = automation.match_streaming(partition_store, tally_df)
+                # The SMS side stays on disk, so there is no full state to continue incrementally from
+                state = None
+            else:
+                if carry_forward:
+                    sms_df, tally_df = automation.match_with_carry_forward(sms_df, tally_df, CARRY_FORWARD_DIR)
+                else:
+                    sms_df, tally_df = automation.match_sms_tally_data(sms_df, tally_df)
+                state = {'sms_df': sms_df, 'tally_df': tally_df, 'match_pairs': automation.match_pairs}
+            st.session_state.reconciliation_state = state
             
             # Check GST if enabled
-            if check_gst and gst_files:
+            gst_reference = None
+            if check_gst and (gst_period or gst_files):
                 status_text.markdown('<div class="info-alert">Verifying GST claims...</div>', unsafe_allow_html=True)
                 progress_bar.progress(85)
-                sms_df = automation.check_gst_for_service_claims(sms_df, gst_files)
-                tally_df = automation.check_gst_for_service_claims(tally_df, gst_files)
+                if gst_period:
+                    gst_reference = get_gst_library().load(gst_period)
+                else:
+                    gst_reference = get_session_gst_reference(automation, gst_files)
+                if not use_streaming:
+                    sms_df = automation.check_gst_for_service_claims(sms_df, gst_reference)
+                tally_df = automation.check_gst_for_service_claims(tally_df, gst_reference)
             
             # Get summary statistics
             progress_bar.progress(95)
-            stats = automation.get_summary_stats(sms_df, tally_df)
+            if use_streaming:
+                # Stats and SMS GST statuses are computed partition by partition; only a preview page is loaded
+                stats, sms_df = automation.summarize_streaming(partition_store, tally_df, gst_reference)
+            else:
+                stats = automation.get_summary_stats(sms_df, tally_df)
             
             progress_bar.progress(100)
             status_text.markdown('<div class="success-alert">Reconciliation completed successfully</div>', unsafe_allow_html=True)
@@ -669,180 +1028,18 @@ if process_button:
                 'stats': stats
             }
             
-            # Display results
-            st.markdown("<br><br>", unsafe_allow_html=True)
-            st.markdown('<div class="card-header">Reconciliation Results</div>', unsafe_allow_html=True)
-            
-            # Metrics in cards
-            col1, col2, col3, col4 = st.columns(4, gap="medium")
-            
-            with col1:
-                st.markdown("""
-                <div class="metric-card success">
-                    <div class="metric-label">Matched SMS</div>
-                    <div class="metric-value">{:,}</div>
-                </div>
-                """.format(stats['matched_sms_count']), unsafe_allow_html=True)
-                
-                st.markdown("""
-                <div class="metric-card warning">
-                    <div class="metric-label">Unmatched SMS</div>
-                    <div class="metric-value">{:,}</div>
-                </div>
-                """.format(stats['unmatched_sms_count']), unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown("""
-                <div class="metric-card success">
-                    <div class="metric-label">Matched Tally</div>
-                    <div class="metric-value">{:,}</div>
-                </div>
-                """.format(stats['matched_tally_count']), unsafe_allow_html=True)
-                
-                st.markdown("""
-                <div class="metric-card warning">
-                    <div class="metric-label">Unmatched Tally</div>
-                    <div class="metric-value">{:,}</div>
-                </div>
-                """.format(stats['unmatched_tally_count']), unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown("""
-                <div class="metric-card info">
-                    <div class="metric-label">Matched SMS Sum</div>
-                    <div class="metric-value">₹{:,.0f}</div>
-                </div>
-                """.format(stats['matched_sms_sum']), unsafe_allow_html=True)
-                
-                st.markdown("""
-                <div class="metric-card">
-                    <div class="metric-label">Total SMS Sum</div>
-                    <div class="metric-value">₹{:,.0f}</div>
-                </div>
-                """.format(stats['total_sms_sum']), unsafe_allow_html=True)
-            
-            with col4:
-                st.markdown("""
-                <div class="metric-card info">
-                    <div class="metric-label">Matched Tally Sum</div>
-                    <div class="metric-value">₹{:,.0f}</div>
-                </div>
-                """.format(stats['matched_tally_sum']), unsafe_allow_html=True)
-                
-                st.markdown("""
-                <div class="metric-card">
-                    <div class="metric-label">Total Tally Sum</div>
-                    <div class="metric-value">₹{:,.0f}</div>
-                </div>
-                """.format(stats['total_tally_sum']), unsafe_allow_html=True)
-            
-            # Check for discrepancies
-            if abs(stats['matched_sms_sum'] - stats['matched_tally_sum']) > 0.01:
-                st.markdown("""
-                <div class="warning-alert">
-                    <strong>Attention:</strong> Sum mismatch detected between matched SMS and Tally records. Please review the data.
-                </div>
-                """, unsafe_allow_html=True)
-            
-            st.markdown("<br>", unsafe_allow_html=True)
-            
-            # Results tabs
-            tab1, tab2 = st.tabs(["SMS Results", "Tally Results"])
-            
-            with tab1:
-                st.markdown('<div class="card-header">SMS Transaction Results</div>', unsafe_allow_html=True)
-                
-                matched_count = len(sms_df[sms_df['Status'] == 'Tallied'])
-                unmatched_count = len(sms_df[sms_df['Status'] == 'Not Tallied'])
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.markdown("""
-                    <div class="success-alert">
-                        <strong>Matched Records:</strong> {:,}
-                    </div>
-                    """.format(matched_count), unsafe_allow_html=True)
-                with col2:
-                    st.markdown("""
-                    <div class="warning-alert">
-                        <strong>Unmatched Records:</strong> {:,}
-                    </div>
-                    """.format(unmatched_count), unsafe_allow_html=True)
-                
-                # Display data
-                sms_display = sms_df.copy()
-                for col in sms_display.columns:
-                    if sms_display[col].dtype == 'object':
-                        sms_display[col] = sms_display[col].astype(str)
-                
-                st.dataframe(sms_display, use_container_width=True, height=400)
-                
-                # Download button
-                csv = sms_df.to_csv(index=False)
-                st.download_button(
-                    label="Download SMS Results",
-                    data=csv,
-                    file_name=f"sms_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
+            # Persist the run so it can be reopened later, with every pair of an incremental session
+            if use_streaming:
+                st.markdown('<div class="info-alert">Streamed runs are not saved to run history</div>', unsafe_allow_html=True)
+            else:
+                store.save_run(
+                    sms_df, tally_df, state['match_pairs'],
+                    settings={'tolerance_days': tolerance_days, 'tolerance_amount': tolerance_amount},
+                    label="{} / {}".format(", ".join(f.name for f in sms_files), ", ".join(f.name for f in tally_files))
                 )
             
-            with tab2:
-                st.markdown('<div class="card-header">Tally Transaction Results</div>', unsafe_allow_html=True)
-                
-                matched_count = len(tally_df[tally_df['Status'] == 'Tallied'])
-                unmatched_count = len(tally_df[tally_df['Status'] == 'Not Tallied'])
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.markdown("""
-                    <div class="success-alert">
-                        <strong>Matched Records:</strong> {:,}
-                    </div>
-                    """.format(matched_count), unsafe_allow_html=True)
-                with col2:
-                    st.markdown("""
-                    <div class="warning-alert">
-                        <strong>Unmatched Records:</strong> {:,}
-                    </div>
-                    """.format(unmatched_count), unsafe_allow_html=True)
-                
-                # Display data
-                tally_display = tally_df.copy()
-                for col in tally_display.columns:
-                    if tally_display[col].dtype == 'object':
-                        tally_display[col] = tally_display[col].astype(str)
-                
-                st.dataframe(tally_display, use_container_width=True, height=400)
-                
-                # Download button
-                csv = tally_df.to_csv(index=False)
-                st.download_button(
-                    label="Download Tally Results",
-                    data=csv,
-                    file_name=f"tally_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
-            
-            # GST summary if applicable
-            if check_gst:
-                st.markdown("<br>", unsafe_allow_html=True)
-                st.markdown('<div class="card-header">GST Verification Summary</div>', unsafe_allow_html=True)
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    if 'GST Status' in sms_df.columns:
-                        st.markdown("**SMS GST Status Distribution**")
-                        sms_gst_counts = sms_df['GST Status'].value_counts()
-                        st.dataframe(sms_gst_counts, use_container_width=True)
-                
-                with col2:
-                    if 'GST Status' in tally_df.columns:
-                        st.markdown("**Tally GST Status Distribution**")
-                        tally_gst_counts = tally_df['GST Status'].value_counts()
-                        st.dataframe(tally_gst_counts, use_container_width=True)
+            # Display results
+            display_results(sms_df, tally_df, stats, check_gst)
             
         except Exception as e:
             progress_bar.empty()
@@ -852,12 +1049,26 @@ if process_button:
             </div>
             """.format(str(e)), unsafe_allow_html=True)
             st.exception(e)
+        finally:
+            if partition_store is not None:
+                shutil.rmtree(partition_store.directory, ignore_errors=True)
     else:
         st.markdown("""
         <div class="warning-alert">
             <strong>Missing Files:</strong> Please upload both SMS and Tally files to begin reconciliation.
         </div>
         """, unsafe_allow_html=True)
+elif load_button:
+    sms_df, tally_df = store.load_run(selected_run)
+    stats = store.summary_stats(selected_run)
+    st.session_state.processing_complete = True
+    st.session_state.results = {
+        'sms_df': sms_df,
+        'tally_df': tally_df,
+        'stats': stats
+    }
+    st.session_state.reconciliation_state = {'sms_df': sms_df, 'tally_df': tally_df}
+    display_results(sms_df, tally_df, stats, check_gst)
 
 chatbot.render_chat_button()
 
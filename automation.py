@@ -4,22 +4,383 @@ import numpy as np
 import configparser
 import os
 import re
+import io
+import time
+from datetime import datetime
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from fuzzywuzzy import fuzz
+from voucher_scanner import VoucherScanner
+from gst_reference import GSTReference
+from file_readers import (EXCEL_FORMATS, detect_format, iter_chunks, parquet_safe, read_csv, read_head, read_parquet,
+                          read_tally_xml)
+
+try:
+    # Rust-based reader, several times faster than openpyxl; used by pandas >= 2.2 when installed
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (2, 2)
+except ImportError:
+    CALAMINE_AVAILABLE = False
 
 class SMSTallyAutomation:
-    def __init__(self, tolerance_days=30, tolerance_amount=0.0):
+    MATCH_ENGINES = ('indexed', 'legacy')
+    # Bump whenever process_sms_data / process_tally_data change, so cached frames are rebuilt
+    PROCESSING_VERSION = 5
+    # Columns the indexed engine reads, shipped to worker processes
+    PARTITION_SMS_COLUMNS = ['TransactionDate', 'Amount', 'TransactionDirection', 'Status',
+                             'Description', 'Remarks', 'Transaction Type']
+    PARTITION_TALLY_COLUMNS = ['Date', 'Amount', 'TransactionDirection', 'Status', 'Vch No.', 'Transaction Type']
+    # SMS rows summarize_streaming keeps in memory for display
+    STREAMING_PREVIEW_ROWS = 5000
+    # Columns process_sms_data uses, read with these dtypes where the workbook allows
+    SMS_READ_COLUMNS = ['TransactionDate', 'TransactionMode', 'Description', 'Remarks', 'Debit', 'Credit',
+                        'PaymentMode', 'Transaction Type']
+    SMS_READ_DTYPES = {'Debit': 'float64', 'Credit': 'float64', 'Description': 'object', 'Remarks': 'object'}
+    # Rows parsed to find the Tally header before reading the body
+    TALLY_HEADER_SCAN_ROWS = 50
+    # Largest split group whose pair sums are indexed for 3- and 4-part splits (~500k pairs)
+    SPLIT_PAIR_INDEX_MAX_ROWS = 1000
+    # Left halves looked up per deadline check in the 3- and 4-part split search
+    SPLIT_LOOKUP_CHUNK = 4096
+    # Processed frames keep low-cardinality columns as categoricals and free text as Arrow strings
+    STATUS_DTYPE = pd.CategoricalDtype(['Not Tallied', 'Tallied'])
+    DIRECTION_DTYPE = pd.CategoricalDtype(['Credit', 'Debit', 'Unknown'])
+    TEXT_DTYPE = pd.StringDtype('pyarrow')
+    SMS_CATEGORY_COLUMNS = ['TransactionMode', 'PaymentMode', 'Transaction Type', 'GST Status']
+    SMS_TEXT_COLUMNS = ['Description', 'Remarks', 'NormalizedID']
+    TALLY_CATEGORY_COLUMNS = ['Vch Type', 'Transaction Type', 'GST Status']
+    TALLY_TEXT_COLUMNS = ['Particulars', 'Vch No.', 'NormalizedID', 'Notes']
+    # Alternative Tally column names and the names process_tally_data uses
+    TALLY_COLUMN_RENAMES = {
+        'TallyNote': 'Notes',
+        'Voucher Type': 'Vch Type',
+        'Voucher No': 'Vch No.',
+        'Voucher No.': 'Vch No.',
+        'Vch No': 'Vch No.',
+    }
+    # GST invoice value headers; a column whose name contains any of them is the amount
+    GST_AMOUNT_COLUMNS = ['INVOICE VALUE', 'INVOICE VALUE(₹)', 'Invoice Value',
+                          'Invoice Value(₹)', 'Invoice Value (₹)', 'InvoiceValue']
+    # GST invoice number and supplier GSTIN headers, matched the same way
+    GST_INVOICE_COLUMNS = ['INVOICE NO', 'INVOICE NUMBER', 'INV NO']
+    GST_GSTIN_COLUMNS = ['GSTIN']
+    # 'amount' checks claims by amount and year only; 'keyed' first joins them to GST
+    # invoices on invoice number / GSTIN found in the ledger and scans amounts as a fallback
+    GST_MODES = ('amount', 'keyed')
+    # Ledger columns searched for invoice numbers and GSTINs in keyed mode (not Vch No.,
+    # which is Tally's own voucher sequence and collides with suppliers' invoice numbers)
+    GST_CLAIM_REFERENCE_COLUMNS = ['Description', 'Remarks', 'Particulars', 'Notes', 'TallyNote',
+                                   'Invoice No', 'GSTIN']
+    GSTIN_PATTERN = r'(\d{2}[A-Z]{5}\d{4}[A-Z][0-9A-Z]Z[0-9A-Z])'
+    # Columns kept in the carry-forward open-items files
+    CARRY_FORWARD_SMS_COLUMNS = ['TransactionDate', 'TransactionMode', 'Description', 'Remarks', 'Debit', 'Credit',
+                                 'Transaction Type', 'Amount', 'NormalizedID', 'GST Status', 'CarriedFrom']
+    CARRY_FORWARD_TALLY_COLUMNS = ['Date', 'Particulars', 'Vch Type', 'Vch No.', 'Debit', 'Credit',
+                                   'Transaction Type', 'Amount', 'NormalizedID', 'GST Status', 'CarriedFrom']
+
+    def __init__(self, tolerance_days=30, tolerance_amount=0.0, engine='indexed',
+                 split_max_parts=5, split_tolerance_days=0, split_time_budget=0.25, split_total_budget=1.0,
+                 workers=None, parallel_min_rows=20000, upload_cache=None, disk_cache=None, gst_mode='amount'):
+        if engine not in self.MATCH_ENGINES:
+            raise ValueError(f"Unknown matching engine '{engine}', expected one of {self.MATCH_ENGINES}")
+        if gst_mode not in self.GST_MODES:
+            raise ValueError(f"Unknown GST mode '{gst_mode}', expected one of {self.GST_MODES}")
         self.tolerance_days = tolerance_days
         self.tolerance_amount = tolerance_amount
+        self.engine = engine
+        # Split matching: how many parts may make up one voucher, how far apart their
+        # dates may be, and how many seconds the open-ended search may spend on one
+        # (date, type, direction) group and on a whole pass
+        self.split_max_parts = split_max_parts
+        self.split_tolerance_days = split_tolerance_days
+        self.split_time_budget = split_time_budget
+        self.split_total_budget = split_total_budget
+        # Parallel matching: worker processes (None = one per CPU) and the combined row
+        # count below which a run stays in-process
+        self.workers = workers
+        self.parallel_min_rows = parallel_min_rows
+        # (sms index, tally index, tier) pairs from the latest match_sms_tally_data call
+        self.match_pairs = []
+        # Optional ParsedUploadCache shared across reruns, backed by an optional DiskFrameCache
+        self.upload_cache = upload_cache
+        self.disk_cache = disk_cache
+        self.gst_mode = gst_mode
     
     def read_excel_file(self, file):
-        """Read Excel file from bytes or path"""
+        """Read an Excel, CSV, Parquet or Tally XML file from bytes or path, through the upload cache when one is set"""
+        return self._load_cached(file, 'excel', self._read_table)
+
+    def _read_table(self, file, columns=None, dtype=None, sheet_name=0):
+        """Read any supported upload into a DataFrame, choosing the reader from its format"""
+        file_format = detect_format(file)
+        if file_format == 'csv':
+            return read_csv(file, columns=columns, dtype=dtype)
+        if file_format == 'parquet':
+            return read_parquet(file, columns=columns)
+        if file_format == 'xml':
+            return read_tally_xml(file)
+        return self._read_excel(file, columns=columns, dtype=dtype, sheet_name=sheet_name)
+
+    def _read_excel(self, file, columns=None, dtype=None, sheet_name=0):
+        """Read a workbook with the fastest available engine.
+
+        columns limits the read to those header names and dtype is declared at read
+        time. If the fast read fails (unsupported workbook, a Debit cell holding text,
+        ...) it falls back to a plain pd.read_excel of every column.
+        """
+        engine = self.excel_engine(file)
+        attempts = []
+        if columns is not None:
+            wanted = set(columns)
+            usecols = lambda col: str(col).strip() in wanted
+            attempts.append({'engine': engine, 'usecols': usecols, 'dtype': dtype})
+            attempts.append({'engine': engine, 'usecols': usecols})
+        attempts.append({'engine': engine})
+
+        for options in attempts:
+            try:
+                return pd.read_excel(self._rewind(file), sheet_name=sheet_name, **options)
+            except Exception:
+                continue
+        return pd.read_excel(self._rewind(file), sheet_name=sheet_name)
+
+    def _rewind(self, file):
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        return file
+
+    def excel_engine(self, file):
+        """Pick the fastest installed pandas engine for the workbook's format"""
+        name = file.name if hasattr(file, 'name') else str(file)
+        extension = os.path.splitext(name)[1].lower()
+        if CALAMINE_AVAILABLE:
+            return 'calamine'
+        if extension == '.xls':
+            return 'xlrd'
+        return 'openpyxl'
+
+    def load_sms_file(self, file, sheet_name=0):
+        """Read and process an SMS upload, reusing the cached frame for bytes seen before"""
+        return self._load_cached(file, self._sheet_kind('sms', sheet_name), lambda f: self.process_sms_data(
+            self._read_table(f, columns=self.SMS_READ_COLUMNS, dtype=self.SMS_READ_DTYPES, sheet_name=sheet_name)))
+
+    def load_tally_file(self, file, sheet_name=0):
+        """Read and process a Tally upload, reusing the cached frame for bytes seen before"""
+        return self._load_cached(file, self._sheet_kind('tally', sheet_name),
+                                 lambda f: self.process_tally_data(*self._read_tally(f, sheet_name)))
+
+    def load_sms_files(self, files):
+        """Read and process several SMS uploads, every sheet of each workbook, into one frame"""
+        return self._load_batch(files, self.load_sms_file)
+
+    def load_tally_files(self, files):
+        """Read and process several Tally uploads, every sheet of each workbook, into one frame"""
+        return self._load_batch(files, self.load_tally_file)
+
+    def _load_batch(self, files, load):
+        """Load every (file, sheet) pair in a thread pool and concatenate them once.
+
+        Each pair gets its own in-memory copy of the upload so threads never share a
+        file position. Rows are tagged with SourceFile and SourceSheet (None for
+        formats without sheets) and keep the order of files and sheets given. The
+        columns stay categorical across files whose category sets differ.
+        """
+        jobs = []
+        for file in files:
+            name = file.name if hasattr(file, 'name') else os.path.basename(str(file))
+            data = self._file_bytes(file)
+            upload = self._named_buffer(data, name)
+            sheets = self.sheet_names(upload) if detect_format(upload) in EXCEL_FORMATS else [None]
+            # The first sheet is read as sheet 0, so it shares the cache entry of a single-sheet load
+            jobs.extend((name, sheet, 0 if position == 0 else sheet, data) for position, sheet in enumerate(sheets))
+
+        def run(job):
+            name, sheet, sheet_name, data = job
+            df = load(self._named_buffer(data, name), sheet_name)
+            df['SourceFile'] = name
+            df['SourceSheet'] = sheet
+            return df
+
+        with ThreadPoolExecutor(max_workers=max(1, min(len(jobs), self.workers or os.cpu_count() or 1))) as executor:
+            frames = list(executor.map(run, jobs))
+        if not frames:
+            return pd.DataFrame()
+
+        # Header-only sheets add no rows, but keep one so the processed columns survive
+        df = pd.concat([frame for frame in frames if not frame.empty] or frames[:1], ignore_index=True)
+        # concat falls back to object when the category sets differ, so restore them
+        category_columns = [col for col in frames[0].columns
+                            if isinstance(frames[0][col].dtype, pd.CategoricalDtype)]
+        return self.compact_dtypes(df, category_columns + ['SourceFile', 'SourceSheet'], [])
+
+    def sheet_names(self, file):
+        """Names of the sheets of a workbook, in workbook order"""
+        with pd.ExcelFile(self._rewind(file), engine=self.excel_engine(file)) as workbook:
+            return list(workbook.sheet_names)
+
+    def _sheet_kind(self, kind, sheet_name):
+        # Sheet 0 keeps the plain cache key, so batch and single-file loads share entries
+        return kind if sheet_name == 0 else '{}:{}'.format(kind, sheet_name)
+
+    def _file_bytes(self, file):
+        if hasattr(file, 'getvalue'):
+            return file.getvalue()
         if hasattr(file, 'read'):
-            # If it's a file-like object (from Streamlit upload)
-            return pd.read_excel(file)
+            return self._rewind(file).read()
+        with open(file, 'rb') as handle:
+            return handle.read()
+
+    def _named_buffer(self, data, name):
+        buffer = io.BytesIO(data)
+        buffer.name = name
+        return buffer
+
+    def _read_tally(self, file, sheet_name=0):
+        """Read a Tally export of any supported format as (df, header_detected)"""
+        file_format = detect_format(file)
+        if file_format == 'xml':
+            # Built from voucher elements, so the columns are already the daybook header
+            return read_tally_xml(file), True
+        if file_format not in EXCEL_FORMATS:
+            return self._read_table(file), False
+        return self._read_tally_excel(file, sheet_name)
+
+    def _read_tally_excel(self, file, sheet_name=0):
+        """Read a Tally export with its header row found from a short sniff of the sheet.
+
+        Only the first TALLY_HEADER_SCAN_ROWS rows are parsed to locate the header (the
+        first row after the top one whose first cell mentions 'Date', as in
+        process_tally_data); the body is then read once with that header. Returns
+        (df, header_detected); when the header isn't in the sniffed rows the whole
+        sheet is read as before and process_tally_data looks for it.
+        """
+        engine = self.excel_engine(file)
+        try:
+            head = pd.read_excel(self._rewind(file), engine=engine, sheet_name=sheet_name, header=None,
+                                 nrows=self.TALLY_HEADER_SCAN_ROWS)
+        except Exception:
+            return self._read_excel(file, sheet_name=sheet_name), False
+
+        header_row = self._tally_header_row(head)
+        if header_row is None:
+            return self._read_excel(file, sheet_name=sheet_name), False
+
+        try:
+            return pd.read_excel(self._rewind(file), engine=engine, sheet_name=sheet_name, header=header_row), True
+        except Exception:
+            return self._read_excel(file, sheet_name=sheet_name), False
+
+    def _tally_header_row(self, head):
+        """Header row position within the first rows of a Tally sheet (read with header=None), or None"""
+        first_col = head.iloc[1:, 0].astype(str)
+        hits = first_col.index[first_col.str.contains('Date', case=False, na=False)]
+        if len(hits):
+            return int(hits[0])
+        if len(head) < self.TALLY_HEADER_SCAN_ROWS:
+            # The sniff covered the whole sheet, so the top row is the header
+            return 0
+        return None
+
+    def validate_upload(self, file, kind, sheet_name=0):
+        """Check an upload's columns from its first rows only, before any full parse.
+
+        kind is 'sms', 'tally' or 'gst'. Returns {'ok', 'errors', 'warnings', 'columns'}:
+        errors mean the file can't be reconciled as that kind (most likely the wrong
+        file), warnings name optional columns that will be filled with blanks.
+        """
+        errors, warnings = [], []
+        try:
+            head = read_head(file, self.TALLY_HEADER_SCAN_ROWS, sheet_name=sheet_name)
+        except Exception as e:
+            return {'ok': False, 'errors': [f"Could not read the file: {e}"], 'warnings': [], 'columns': []}
+
+        if head.empty:
+            return {'ok': False, 'errors': ["The file has no rows"], 'warnings': [], 'columns': []}
+
+        # Tally sheets may carry a company/report preamble above the header; when the
+        # header isn't found in the sniff, the top row is taken, as the full read does
+        header_row = (self._tally_header_row(head) if kind == 'tally' else 0) or 0
+        columns = [str(col).strip() for col in head.iloc[header_row] if pd.notna(col) and str(col).strip()]
+
+        if kind == 'sms':
+            if 'TransactionDate' not in columns:
+                errors.append("Missing column 'TransactionDate'")
+            if 'Debit' not in columns and 'Credit' not in columns:
+                errors.append("Missing both 'Debit' and 'Credit' columns")
+            for col in ('Description', 'Remarks', 'TransactionMode'):
+                if col not in columns:
+                    warnings.append(f"Missing column '{col}', it will be left blank")
+            if 'PaymentMode' not in columns and 'Transaction Type' not in columns:
+                warnings.append("No 'PaymentMode' or 'Transaction Type' column, every row will be typed OTHERS")
+        elif kind == 'tally':
+            columns = [self.TALLY_COLUMN_RENAMES.get(col, col) for col in columns]
+            if 'Date' not in columns:
+                errors.append("Missing column 'Date'")
+            if 'Debit' not in columns and 'Credit' not in columns:
+                errors.append("Missing both 'Debit' and 'Credit' columns")
+            for col in ('Particulars', 'Vch Type', 'Vch No.'):
+                if col not in columns:
+                    warnings.append(f"Missing column '{col}', it will be left blank")
+        elif kind == 'gst':
+            if self._gst_column(columns, self.GST_AMOUNT_COLUMNS) is None:
+                errors.append("No invoice value column (expected one of: {})".format(', '.join(self.GST_AMOUNT_COLUMNS)))
+            if not any('date' in col.lower() for col in columns):
+                warnings.append("No date column, the year will be taken from the file name")
         else:
-            # If it's a file path
-            return pd.read_excel(file)
-    
+            raise ValueError(f"Unknown upload kind '{kind}', expected 'sms', 'tally' or 'gst'")
+
+        return {'ok': not errors, 'errors': errors, 'warnings': warnings, 'columns': columns}
+
+    def validate_uploads(self, uploads):
+        """Pre-flight every upload in {kind: [files]}; returns {'errors', 'warnings'} as
+        messages prefixed with the file (and sheet) they concern.
+
+        SMS and Tally workbooks are checked sheet by sheet, like load_sms_files and
+        load_tally_files read them; GST files only on their first sheet. A workbook is
+        only an error when none of its sheets has the required columns; other sheets
+        (a summary, notes) are reported as warnings, since they load as no rows.
+        """
+        errors, warnings = [], []
+        for kind, files in uploads.items():
+            for file in files or []:
+                name = file.name if hasattr(file, 'name') else os.path.basename(str(file))
+                sheets = [0]
+                if kind != 'gst' and detect_format(file) in EXCEL_FORMATS:
+                    try:
+                        sheets = self.sheet_names(file)
+                    except Exception:
+                        sheets = [0]
+                results = [(sheet, self.validate_upload(file, kind, sheet_name=sheet)) for sheet in sheets]
+                usable = any(result['ok'] for _, result in results)
+                for sheet, result in results:
+                    label = f"{kind.upper()} file {name}" + (f" (sheet {sheet})" if sheet != 0 else "")
+                    if usable and not result['ok']:
+                        warnings.append(f"{label}: sheet will be skipped ({'; '.join(result['errors'])})")
+                        continue
+                    errors.extend(f"{label}: {message}" for message in result['errors'])
+                    warnings.extend(f"{label}: {message}" for message in result['warnings'])
+        return {'errors': errors, 'warnings': warnings}
+
+    def load_sms_file_streaming(self, file, partition_store, chunk_rows=50000):
+        """Read and process an SMS upload chunk by chunk into an SMSPartitionStore.
+
+        Only one chunk of raw and processed rows is in memory at a time. Rows are
+        appended to the store, so several uploads can be streamed into one.
+        """
+        for chunk in iter_chunks(file, columns=self.SMS_READ_COLUMNS, dtype=self.SMS_READ_DTYPES,
+                                 chunk_rows=chunk_rows):
+            partition_store.append(self.process_sms_data(chunk))
+        return partition_store
+
+    def _load_cached(self, file, kind, parse):
+        """Look file up in the memory cache, then the disk cache, and parse it only on a double miss"""
+        if self.disk_cache is not None:
+            parse_from_disk = parse
+            parse = lambda f: self.disk_cache.get_or_parse(f, kind, parse_from_disk, self.PROCESSING_VERSION)
+        if self.upload_cache is not None:
+            return self.upload_cache.get_or_parse(file, kind, parse, self.PROCESSING_VERSION)
+        return parse(file)
+
     def process_sms_data(self, df):
         # Check if PaymentMode column exists, if not use Transaction Type
         if 'PaymentMode' in df.columns:
@@ -37,27 +398,19 @@ class SMSTallyAutomation:
                 df[col] = None  # Add missing columns to avoid KeyErrors
 
         df['TransactionDate'] = pd.to_datetime(df['TransactionDate'], errors='coerce')
-        
-        df['Amount'] = pd.to_numeric(df['Debit'], errors='coerce').fillna(0) - pd.to_numeric(df['Credit'], errors='coerce').fillna(0)
-        
-        df['NormalizedID'] = df['Description'].astype(str).str.upper().str.replace('[^A-Z0-9]', '')
-        
-        df['Status'] = 'Not Tallied'
-        df['GST Status'] = 'Not Checked'
+        df = self._normalize(df, 'Description')
 
         # Normalize formatting for relevant columns
-        df['Description'] = df['Description'].str.strip().str.upper()
+        df['Description'] = df['Description'].str.strip().astype(str).str.upper()
         df['TransactionMode'] = df['TransactionMode'].str.strip().str.upper()
-        df['Amount'] = df['Amount'].round(2)  # Round to 2 decimal places
-        df['TransactionDate'] = pd.to_datetime(df['TransactionDate'], errors='coerce')
-        df['Description'] = df['Description'].astype(str).str.upper()
         df['Remarks'] = df['Remarks'].astype(str).str.upper()
-        df['Transaction Type'] = df['Transaction Type'].astype(str).str.upper()
 
-        return df
+        return self.compact_dtypes(df, self.SMS_CATEGORY_COLUMNS, self.SMS_TEXT_COLUMNS)
     
-    def process_tally_data(self, df):
-        date_row_index = df.index[df.iloc[:, 0].astype(str).str.contains('Date', case=False, na=False)].tolist()
+    def process_tally_data(self, df, header_detected=False):
+        # header_detected: the frame was read with the right header row already (_read_tally)
+        date_row_index = [] if header_detected else \
+            df.index[df.iloc[:, 0].astype(str).str.contains('Date', case=False, na=False)].tolist()
 
         if date_row_index:
             header_row = date_row_index[0]
@@ -70,15 +423,7 @@ class SMSTallyAutomation:
         df.columns = df.columns.str.strip()
 
         # Handle unexpected columns
-        column_renames = {
-            'TallyNote': 'Notes',
-            'Voucher Type': 'Vch Type',
-            'Voucher No': 'Vch No.',
-            'Voucher No.': 'Vch No.',
-            'Vch No': 'Vch No.',
-        }
-        
-        for old_col, new_col in column_renames.items():
+        for old_col, new_col in self.TALLY_COLUMN_RENAMES.items():
             if old_col in df.columns and new_col not in df.columns:
                 df = df.rename(columns={old_col: new_col})
     
@@ -91,46 +436,327 @@ class SMSTallyAutomation:
         df['Transaction Type'] = df['Vch Type']
 
         df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        
-        df['Amount'] = pd.to_numeric(df['Debit'], errors='coerce').fillna(0) - pd.to_numeric(df['Credit'], errors='coerce').fillna(0)
-        
-        df['NormalizedID'] = df['Vch No.'].astype(str).str.upper().str.replace('[^A-Z0-9]', '')
-        
+        df = self._normalize(df, 'Vch No.')
+        df['Vch No.'] = df['Vch No.'].astype(str).str.upper()
+
+        return self.compact_dtypes(df, self.TALLY_CATEGORY_COLUMNS, self.TALLY_TEXT_COLUMNS)
+
+    def _normalize(self, df, id_col):
+        """Derived columns shared by SMS and Tally frames, each computed once and vectorized.
+
+        Adds Amount (Debit - Credit, rounded to paise), NormalizedID from id_col,
+        Status, GST Status and TransactionDirection, and upper-cases Transaction Type.
+        The date column is expected to be parsed already.
+        """
+        debit = pd.to_numeric(df['Debit'], errors='coerce')
+        credit = pd.to_numeric(df['Credit'], errors='coerce')
+
+        df['Amount'] = (debit.fillna(0) - credit.fillna(0)).round(2)
+        df['NormalizedID'] = df[id_col].astype(str).str.upper().str.replace('[^A-Z0-9]', '')
         df['Status'] = 'Not Tallied'
         df['GST Status'] = 'Not Checked'
-        
-        df['Amount'] = df['Amount'].round(2)  # Round to 2 decimal places
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        df['Vch No.'] = df['Vch No.'].astype(str).str.upper()
+        df['TransactionDirection'] = self.transaction_directions(debit, credit, df.index)
         df['Transaction Type'] = df['Transaction Type'].astype(str).str.upper()
+        return df
+
+    def transaction_directions(self, debit, credit, index):
+        """'Credit' where Credit is non-zero, else 'Debit' where Debit is, else 'Unknown'"""
+        debit = np.asarray(debit, dtype='float64')
+        credit = np.asarray(credit, dtype='float64')
+        directions = np.select([~np.isnan(credit) & (credit != 0), ~np.isnan(debit) & (debit != 0)],
+                               ['Credit', 'Debit'], 'Unknown')
+        return pd.Series(pd.Categorical(directions, dtype=self.DIRECTION_DTYPE), index=index)
 
+    def compact_dtypes(self, df, category_columns, text_columns):
+        """Store Status and the given columns as categoricals / Arrow strings.
+
+        Amounts stay float64 rupees and dates datetime64[ns]: both are already 8-byte
+        native columns, so integer paise would save nothing.
+        """
+        for col in category_columns:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        for col in text_columns:
+            if col in df.columns:
+                df[col] = df[col].astype(self.TEXT_DTYPE)
+        if 'Status' in df.columns:
+            df['Status'] = df['Status'].astype(self.STATUS_DTYPE)
         return df
     
-    def match_sms_tally_data(self, sms_df, tally_df):
+    def match_sms_tally_data(self, sms_df, tally_df, engine=None):
+        engine = engine or self.engine
+        if engine not in self.MATCH_ENGINES:
+            raise ValueError(f"Unknown matching engine '{engine}', expected one of {self.MATCH_ENGINES}")
+
         matched_sms_indices = set()
         matched_tally_indices = set()
+        self.match_pairs = []
 
-        # Add columns to track whether transaction is Debit or Credit
-        sms_df['TransactionDirection'] = sms_df.apply(
-            lambda row: 'Credit' if pd.notna(row.get('Credit')) and float(row.get('Credit', 0)) != 0 
-            else 'Debit' if pd.notna(row.get('Debit')) and float(row.get('Debit', 0)) != 0 
-            else 'Unknown', axis=1
-        )
-        
-        tally_df['TransactionDirection'] = tally_df.apply(
-            lambda row: 'Credit' if pd.notna(row.get('Credit')) and float(row.get('Credit', 0)) != 0 
-            else 'Debit' if pd.notna(row.get('Debit')) and float(row.get('Debit', 0)) != 0 
-            else 'Unknown', axis=1
-        )
+        # Frames from process_sms_data / process_tally_data already carry parsed dates,
+        # rounded amounts and TransactionDirection; only foreign frames need directions
+        for df in (sms_df, tally_df):
+            if 'TransactionDirection' not in df.columns:
+                df['TransactionDirection'] = self.transaction_directions(
+                    pd.to_numeric(df['Debit'], errors='coerce'), pd.to_numeric(df['Credit'], errors='coerce'), df.index)
 
-        # Convert to datetime for proper comparison
-        sms_df['TransactionDate'] = pd.to_datetime(sms_df['TransactionDate'], errors='coerce')
-        tally_df['Date'] = pd.to_datetime(tally_df['Date'], errors='coerce')
-        
-        # Round amounts for consistent comparison
-        sms_df['Amount'] = sms_df['Amount'].round(2)
-        tally_df['Amount'] = tally_df['Amount'].round(2)
+        if engine == 'indexed':
+            self._match_indexed(sms_df, tally_df, matched_sms_indices, matched_tally_indices)
+        else:
+            self._match_legacy(sms_df, tally_df, matched_sms_indices, matched_tally_indices)
+
+        # Handle split transactions (combining multiple SMS transactions into one Tally entry)
+        self.handle_split_transactions(sms_df, tally_df, matched_sms_indices, matched_tally_indices)
+
+        # Handle reverse splits (one SMS transaction settling several Tally vouchers)
+        self.handle_reverse_split_transactions(sms_df, tally_df, matched_sms_indices, matched_tally_indices)
+
+        # Mark remaining records as 'Not Tallied'
+        sms_df.loc[~sms_df.index.isin(matched_sms_indices), 'Status'] = 'Not Tallied'
+        tally_df.loc[~tally_df.index.isin(matched_tally_indices), 'Status'] = 'Not Tallied'
+
+        return sms_df, tally_df
+    
+    def reconcile_incremental(self, state, new_sms_df, new_tally_df, engine=None):
+        """Add new SMS/Tally rows to a previous run without re-matching its history.
+
+        state is the dict returned by a previous call (or None for the first run);
+        new_sms_df / new_tally_df are process_sms_data / process_tally_data output.
+        Only the still-open history rows dated within tolerance_days of the new data
+        are matched again, together with the new rows.
+
+        Returns (state, delta): state holds the cumulative 'sms_df' / 'tally_df' and
+        'match_pairs' (every pair made across the runs, like match_pairs), and delta holds the rows tallied by this run ('new_matches_sms', 'new_matches_tally'),
+        every still-open row ('open_sms', 'open_tally') and the cumulative 'stats'.
+        """
+        if state is None:
+            sms_df, tally_df = self.match_sms_tally_data(new_sms_df, new_tally_df, engine=engine)
+            touched_sms, touched_tally = sms_df.index, tally_df.index
+            match_pairs = list(self.match_pairs)
+        else:
+            sms_df = self._append_rows(state['sms_df'], new_sms_df)
+            tally_df = self._append_rows(state['tally_df'], new_tally_df)
+            new_sms_index = sms_df.index[len(state['sms_df']):]
+            new_tally_index = tally_df.index[len(state['tally_df']):]
+
+            # Window of dates the new rows can reach, widened by the date tolerance
+            new_dates = pd.concat([pd.to_datetime(sms_df.loc[new_sms_index, 'TransactionDate'], errors='coerce'),
+                                   pd.to_datetime(tally_df.loc[new_tally_index, 'Date'], errors='coerce')]).dropna()
+            if new_dates.empty:
+                touched_sms, touched_tally = new_sms_index, new_tally_index
+            else:
+                min_date = new_dates.min() - pd.Timedelta(days=self.tolerance_days)
+                max_date = new_dates.max() + pd.Timedelta(days=self.tolerance_days)
+                open_sms = sms_df.index[:len(state['sms_df'])][
+                    (state['sms_df']['Status'] != 'Tallied') &
+                    pd.to_datetime(state['sms_df']['TransactionDate'], errors='coerce').between(min_date, max_date)
+                ]
+                open_tally = tally_df.index[:len(state['tally_df'])][
+                    (state['tally_df']['Status'] != 'Tallied') &
+                    pd.to_datetime(state['tally_df']['Date'], errors='coerce').between(min_date, max_date)
+                ]
+                touched_sms = open_sms.append(new_sms_index)
+                touched_tally = open_tally.append(new_tally_index)
+
+            # History labels are stable, so earlier pairs still point at the same rows
+            match_pairs = state.get('match_pairs', []) + self._match_subset(
+                sms_df, tally_df, touched_sms, touched_tally, engine=engine)
+
+        touched_sms = sms_df.loc[touched_sms]
+        touched_tally = tally_df.loc[touched_tally]
+        delta = {
+            'new_matches_sms': touched_sms[touched_sms['Status'] == 'Tallied'],
+            'new_matches_tally': touched_tally[touched_tally['Status'] == 'Tallied'],
+            'open_sms': sms_df[sms_df['Status'] != 'Tallied'],
+            'open_tally': tally_df[tally_df['Status'] != 'Tallied'],
+            'stats': self.get_summary_stats(sms_df, tally_df),
+        }
+        return {'sms_df': sms_df, 'tally_df': tally_df, 'match_pairs': match_pairs}, delta
+
+    def _append_rows(self, history_df, new_df):
+        """Append new rows after history, relabelled so history labels stay stable"""
+        new_df = new_df.copy()
+        start = (history_df.index.max() + 1) if len(history_df) else 0
+        new_df.index = pd.RangeIndex(start, start + len(new_df))
+        return pd.concat([history_df, new_df])
+
+    def _match_subset(self, sms_df, tally_df, sms_labels, tally_labels, engine=None):
+        """Match only the given rows and write their results back into the full frames.
+
+        Returns the pairs made, like match_pairs.
+        """
+        if not len(sms_labels) or not len(tally_labels):
+            return []
+        sub_sms, sub_tally = self.match_sms_tally_data(sms_df.loc[sms_labels].copy(),
+                                                       tally_df.loc[tally_labels].copy(), engine=engine)
+        for df, sub_df in ((sms_df, sub_sms), (tally_df, sub_tally)):
+            for col in ('TransactionDirection', 'Status', 'MatchRemarks', 'MatchDetails'):
+                if col not in sub_df.columns:
+                    continue
+                if col not in df.columns:
+                    df[col] = pd.Series(dtype=object)
+                df.loc[sub_df.index, col] = sub_df[col]
+        return list(self.match_pairs)
+
+    def match_with_carry_forward(self, sms_df, tally_df, open_items_dir, period=None, engine=None):
+        """Match a period's data, probing last period's open items first.
+
+        Open SMS/Tally rows saved in open_items_dir by the latest earlier period are
+        appended to the fresh frames (CarriedFrom names their period) and matched in
+        three passes: carried SMS against fresh Tally, fresh SMS against carried Tally,
+        then fresh against fresh. Everything still open afterwards is saved as this
+        period's open items, replacing any from an earlier run of the same period, so
+        rerunning a period never carries its own rows back in.
+        """
+        period = period or datetime.now().strftime('%Y-%m')
+        carried_sms, carried_tally = self.load_open_items(open_items_dir, before=period)
+
+        fresh_sms_count, fresh_tally_count = len(sms_df), len(tally_df)
+        sms_df = sms_df.copy()
+        tally_df = tally_df.copy()
+        sms_df['CarriedFrom'] = None
+        tally_df['CarriedFrom'] = None
+        sms_df = self._append_rows(sms_df, carried_sms)
+        tally_df = self._append_rows(tally_df, carried_tally)
+
+        fresh_sms, old_sms = sms_df.index[:fresh_sms_count], sms_df.index[fresh_sms_count:]
+        fresh_tally, old_tally = tally_df.index[:fresh_tally_count], tally_df.index[fresh_tally_count:]
+
+        match_pairs = []
+        match_pairs += self._match_subset(sms_df, tally_df, old_sms, fresh_tally, engine=engine)
+        open_fresh_tally = fresh_tally[tally_df.loc[fresh_tally, 'Status'] != 'Tallied']
+        match_pairs += self._match_subset(sms_df, tally_df, fresh_sms, old_tally, engine=engine)
+        open_fresh_sms = fresh_sms[sms_df.loc[fresh_sms, 'Status'] != 'Tallied']
+        match_pairs += self._match_subset(sms_df, tally_df, open_fresh_sms, open_fresh_tally, engine=engine)
+        self.match_pairs = match_pairs
+
+        sms_df.loc[fresh_sms, 'CarriedFrom'] = None
+        tally_df.loc[fresh_tally, 'CarriedFrom'] = None
+        self.save_open_items(sms_df, tally_df, open_items_dir, period)
+        return sms_df, tally_df
+
+    def match_streaming(self, partition_store, tally_df, engine=None):
+        """Match Tally rows against SMS rows held in an SMSPartitionStore, month by month.
+
+        Tally rows are taken one calendar month at a time and matched against the SMS
+        partitions within tolerance_days of that month, so only those partitions are
+        in memory. A partition is written back, with its statuses, once no later
+        month can reach it. Returns the matched tally_df; the SMS side stays in the
+        store (summarize_streaming reads it back one partition at a time).
+        """
+        tally_dates = pd.to_datetime(tally_df['Date'], errors='coerce')
+        tally_months = tally_dates.dt.to_period('M')
+        tolerance = pd.Timedelta(days=self.tolerance_days)
+
+        loaded = {}
+        match_pairs = []
+        for month in sorted(tally_months.dropna().unique()):
+            needed = partition_store.months_between(month.start_time - tolerance, month.end_time + tolerance)
+            for key in [key for key in loaded if key not in needed]:
+                partition_store.write(key, loaded.pop(key))
+            for key in needed:
+                if key not in loaded:
+                    loaded[key] = partition_store.read([key])
+            if not needed:
+                continue
+
+            window = pd.concat([loaded[key] for key in needed]).sort_index()
+            sms_labels = window.index[window['Status'] != 'Tallied']
+            tally_labels = tally_df.index[(tally_months == month) & (tally_df['Status'] != 'Tallied')]
+            match_pairs += self._match_subset(window, tally_df, sms_labels, tally_labels, engine=engine)
+            for key in needed:
+                loaded[key] = window.loc[loaded[key].index]
+
+        for key in list(loaded):
+            partition_store.write(key, loaded.pop(key))
+        tally_df.loc[tally_df['Status'] != 'Tallied', 'Status'] = 'Not Tallied'
+        self.match_pairs = match_pairs
+        return tally_df
+
+    def summarize_streaming(self, partition_store, tally_df, gst_reference=None, preview_rows=None):
+        """Summary stats for a match_streaming run without loading the SMS side whole.
+
+        Partitions are read one at a time; with a gst_reference each is GST-checked
+        and written back. Returns (stats, preview) where preview holds the first
+        preview_rows SMS rows for display; stats also carries 'sms_gst_counts' when
+        GST was checked.
+        """
+        preview_rows = self.STREAMING_PREVIEW_ROWS if preview_rows is None else preview_rows
+        stats = self.get_summary_stats(pd.DataFrame({'Status': [], 'Amount': []}), tally_df)
+        gst_counts = pd.Series(dtype='int64')
+        preview = []
+        shown = 0
+        for month in partition_store.months():
+            part = partition_store.read([month])
+            if part.empty:
+                continue
+            if gst_reference is not None:
+                part = self.check_gst_for_service_claims(part, gst_reference)
+                partition_store.write(month, part)
+                gst_counts = gst_counts.add(part['GST Status'].value_counts(), fill_value=0)
+
+            part_stats = self.get_summary_stats(part, tally_df.iloc[:0])
+            for key in ('matched_sms_count', 'unmatched_sms_count', 'matched_sms_sum', 'total_sms_sum'):
+                stats[key] += part_stats[key]
+            if shown < preview_rows:
+                preview.append(part.iloc[:preview_rows - shown])
+                shown += len(preview[-1])
+
+        if gst_reference is not None:
+            stats['sms_gst_counts'] = gst_counts.astype('int64').sort_values(ascending=False)
+        preview = pd.concat(preview) if preview else pd.DataFrame(columns=['Status', 'Amount'])
+        return stats, preview
+
+    def save_open_items(self, sms_df, tally_df, open_items_dir, period):
+        """Write the unmatched rows of a period's run to Parquet for the next period's run"""
+        if not re.fullmatch(r'[\w][\w.-]*', str(period)):
+            raise ValueError(f"Invalid carry-forward period '{period}'")
+        if not os.path.exists(open_items_dir):
+            os.makedirs(open_items_dir)
+
+        for df, columns, name in ((sms_df, self.CARRY_FORWARD_SMS_COLUMNS, f'open_sms_{period}.parquet'),
+                                  (tally_df, self.CARRY_FORWARD_TALLY_COLUMNS, f'open_tally_{period}.parquet')):
+            open_rows = df.loc[df['Status'] != 'Tallied', [col for col in columns if col in df.columns]].copy()
+            open_rows['CarriedFrom'] = (open_rows['CarriedFrom'].fillna(period)
+                                        if 'CarriedFrom' in open_rows.columns else period)
+            parquet_safe(open_rows).reset_index(drop=True).to_parquet(os.path.join(open_items_dir, name), index=False)
 
+    def load_open_items(self, open_items_dir, before=None):
+        """Return the (sms_df, tally_df) open items saved by save_open_items, ready to match.
+
+        Each period's files already hold every item still open after it, so only the
+        latest saved period (earlier than before, when given) is read.
+        """
+        periods = self.open_item_periods(open_items_dir)
+        if before is not None:
+            periods = [period for period in periods if period < str(before)]
+        period = periods[-1] if periods else None
+
+        frames = []
+        for kind in ('sms', 'tally'):
+            # Files saved before open items were kept per period have no period in the name
+            name = f'open_{kind}_{period}.parquet' if period else f'open_{kind}.parquet'
+            path = os.path.join(open_items_dir, name)
+            df = pd.read_parquet(path) if period is not None and os.path.exists(path) else pd.DataFrame()
+            if not df.empty:
+                df['Status'] = pd.Series('Not Tallied', index=df.index, dtype=self.STATUS_DTYPE)
+                df['TransactionDirection'] = self.transaction_directions(
+                    pd.to_numeric(df['Debit'], errors='coerce'), pd.to_numeric(df['Credit'], errors='coerce'), df.index)
+            frames.append(df)
+        return frames[0], frames[1]
+
+    def open_item_periods(self, open_items_dir):
+        """Periods with saved open items, oldest first ('' for files saved without a period)"""
+        if not os.path.exists(open_items_dir):
+            return []
+        periods = set()
+        for name in os.listdir(open_items_dir):
+            match = re.fullmatch(r'open_sms(?:_(.+))?\.parquet', name)
+            if match:
+                periods.add(match.group(1) or '')
+        return sorted(periods)
+
+    def _match_legacy(self, sms_df, tally_df, matched_sms_indices, matched_tally_indices):
+        """Greedy row-by-row matching, scanning the whole SMS frame per Tally row"""
         # First, try to match exact amount + date within tolerance + same direction
         for idx, tally_row in tally_df.iterrows():
             if idx in matched_tally_indices:
@@ -173,6 +799,7 @@ class SMSTallyAutomation:
                 tally_df.at[idx, 'MatchRemarks'] = f"Matched with SMS: Amount {best_match['Amount']}, Date {best_match['TransactionDate'].strftime('%d-%b-%Y')}"
                 
                 matched_sms_indices.add(best_match_idx)
+                self.match_pairs.append((best_match_idx, idx, 'exact'))
                 matched_tally_indices.add(idx)
                 continue
             
@@ -204,15 +831,268 @@ class SMSTallyAutomation:
                         self.mark_as_tallied(tally_row, best_match, sms_df, tally_df, 
                                         matched_sms_indices, matched_tally_indices)
 
-        # Handle split transactions (combining multiple SMS transactions into one Tally entry)
-        self.handle_split_transactions(sms_df, tally_df, matched_sms_indices, matched_tally_indices)
+    def _match_indexed(self, sms_df, tally_df, matched_sms_indices, matched_tally_indices):
+        """Run the indexed engine, across a process pool when the inputs are large enough"""
+        workers = self._worker_count(len(sms_df) + len(tally_df))
+        if workers > 1:
+            matches = self._match_partitioned(sms_df, tally_df, workers)
+        else:
+            matches = self._find_indexed_matches(sms_df, tally_df)
 
-        # Mark remaining records as 'Not Tallied'
-        sms_df.loc[~sms_df.index.isin(matched_sms_indices), 'Status'] = 'Not Tallied'
-        tally_df.loc[~tally_df.index.isin(matched_tally_indices), 'Status'] = 'Not Tallied'
+        # Writes are collected per column in first-use order and applied in bulk at the end
+        sms_updates = {}
+        tally_updates = {}
+        for t_pos, s_pos, tier, remarks in matches:
+            self._record_match(sms_updates, tally_updates, sms_df.index[s_pos], tally_df.index[t_pos], remarks)
+            self.match_pairs.append((sms_df.index[s_pos], tally_df.index[t_pos], tier))
+
+        self._apply_updates(sms_df, sms_updates, matched_sms_indices)
+        self._apply_updates(tally_df, tally_updates, matched_tally_indices)
+
+    def _find_indexed_matches(self, sms_df, tally_df):
+        """Indexed matching with the same greedy pairing as _match_legacy.
+
+        SMS rows are bucketed once by (direction, amount in paise) and sorted by date
+        inside each bucket, so each Tally row only visits the rows in its own bucket(s)
+        and date window instead of the whole SMS frame. Ties on date difference go to
+        the earliest SMS row, exactly like idxmin does.
+
+        Returns (tally position, SMS position, tier, remarks) tuples in Tally row order.
+        """
+        day_ns = pd.Timedelta(days=1).value
+        window_ns = pd.Timedelta(days=self.tolerance_days).value
+        tolerance = self.tolerance_amount
+
+        sms_amounts = sms_df['Amount'].to_numpy(dtype='float64', na_value=np.nan)
+        sms_dates = sms_df['TransactionDate'].to_numpy(dtype='datetime64[ns]').view('i8')
+        sms_directions = sms_df['TransactionDirection'].to_numpy()
+        sms_valid = ~np.isnan(sms_amounts) & sms_df['TransactionDate'].notna().to_numpy()
+        available = (sms_df['Status'] == 'Not Tallied').to_numpy() & sms_valid
+
+        sms_paise = np.zeros(len(sms_df), dtype='int64')
+        sms_paise[sms_valid] = np.rint(sms_amounts[sms_valid] * 100)
+
+        # Exact tier candidates are split by direction; the fuzzy tier ignores direction
+        direction_index = {
+            direction: self._build_candidate_index(np.flatnonzero(sms_valid & (sms_directions == direction)),
+                                                   sms_paise, sms_dates)
+            for direction in ('Credit', 'Debit')
+        }
+        fuzzy_index = None
+        if tolerance > 0:
+            fuzzy_index = self._build_candidate_index(np.flatnonzero(sms_valid), sms_paise, sms_dates)
+            score_columns = self.prepare_score_columns(sms_df, vouchers=tally_df['Vch No.'])
+
+        tally_amounts = tally_df['Amount'].to_numpy(dtype='float64', na_value=np.nan)
+        tally_dates = tally_df['Date'].to_numpy(dtype='datetime64[ns]').view('i8')
+        tally_valid = ~np.isnan(tally_amounts) & tally_df['Date'].notna().to_numpy()
+        tally_directions = tally_df['TransactionDirection'].to_numpy()
+
+        matches = []
+        for t_pos in np.flatnonzero(tally_valid):
+            amount = tally_amounts[t_pos]
+            date = tally_dates[t_pos]
+            direction = tally_directions[t_pos]
+
+            if direction in direction_index:
+                candidates = self._probe_candidates(direction_index[direction], amount, date, window_ns,
+                                                     sms_amounts, sms_dates, available)
+                if len(candidates):
+                    date_diffs = np.abs((sms_dates[candidates] - date) // day_ns)
+                    s_pos = candidates[date_diffs == date_diffs.min()].min()
+                    tally_date = tally_df['Date'].iat[t_pos]
+                    sms_date = sms_df['TransactionDate'].iat[s_pos]
+                    available[s_pos] = False
+                    matches.append((t_pos, s_pos, 'exact', {
+                        'MatchRemarks': (
+                            f"Matched with Tally: Amount {tally_df['Amount'].iat[t_pos]}, Date {tally_date.strftime('%d-%b-%Y')}",
+                            f"Matched with SMS: Amount {sms_df['Amount'].iat[s_pos]}, Date {sms_date.strftime('%d-%b-%Y')}",
+                        )
+                    }))
+                    continue
+
+            if fuzzy_index is not None:
+                candidates = self._probe_candidates(fuzzy_index, amount, date, window_ns,
+                                                    sms_amounts, sms_dates, available)
+                if len(candidates):
+                    tally_row = tally_df.iloc[t_pos]
+                    # Score in frame order so ties keep the first row, as iterrows did
+                    candidates = np.sort(candidates)
+                    scores = self._score_candidates(tally_row, score_columns, candidates)
+                    scores += np.where(score_columns['direction'][candidates] == tally_row['TransactionDirection'], 20, 0)
+
+                    best = int(np.argmax(scores))
+                    if scores[best] > 30:  # Threshold for matching
+                        s_pos = candidates[best]
+                        sms_row = sms_df.iloc[s_pos]
+                        available[s_pos] = False
+                        matches.append((t_pos, s_pos, 'fuzzy', {
+                            'MatchDetails': self._match_details(tally_row, sms_row)
+                        }))
+
+        return matches
+
+    def _worker_count(self, total_rows):
+        """Number of worker processes for a run; small inputs stay in this process"""
+        if total_rows < self.parallel_min_rows:
+            return 1
+        return max(1, self.workers or os.cpu_count() or 1)
+
+    def _match_partitioned(self, sms_df, tally_df, workers):
+        """Match independent partitions in a process pool and merge them in Tally row order.
+
+        Partitions never share a candidate pair (see _partition_rows), so every Tally row
+        sees exactly the candidates it would see in a serial run and the merged result
+        is identical to _find_indexed_matches on the full frames.
+        """
+        partitions = self._partition_rows(sms_df, tally_df, workers)
+        if len(partitions) < 2:
+            return self._find_indexed_matches(sms_df, tally_df)
+
+        settings = {'tolerance_days': self.tolerance_days, 'tolerance_amount': self.tolerance_amount}
+        sms_cols = [col for col in self.PARTITION_SMS_COLUMNS if col in sms_df.columns]
+        tally_cols = [col for col in self.PARTITION_TALLY_COLUMNS if col in tally_df.columns]
+
+        matches = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(partitions))) as executor:
+            futures = [
+                (sms_positions, tally_positions, executor.submit(
+                    _match_partition, settings,
+                    sms_df.iloc[sms_positions][sms_cols], tally_df.iloc[tally_positions][tally_cols]))
+                for sms_positions, tally_positions in partitions
+            ]
+            for sms_positions, tally_positions, future in futures:
+                for t_pos, s_pos, tier, remarks in future.result():
+                    matches.append((tally_positions[t_pos], sms_positions[s_pos], tier, remarks))
+
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def _partition_rows(self, sms_df, tally_df, parts):
+        """Split row positions into at most `parts` groups that cannot match across groups.
+
+        Rows are clustered by amount (by direction and exact paise when there is no amount
+        tolerance, otherwise by runs of amounts closer than the tolerance) and each cluster
+        is cut wherever consecutive dates are more than tolerance_days apart, the halo a
+        Tally row can reach. Clusters are then packed, largest first, into the partitions.
+        """
+        frames = []
+        for side, df, date_col in ((0, sms_df, 'TransactionDate'), (1, tally_df, 'Date')):
+            amounts = df['Amount'].to_numpy(dtype='float64', na_value=np.nan)
+            valid = ~np.isnan(amounts) & df[date_col].notna().to_numpy()
+            positions = np.flatnonzero(valid)
+            frames.append(pd.DataFrame({
+                'side': side,
+                'position': positions,
+                'paise': np.rint(amounts[positions] * 100).astype('int64'),
+                'date': df[date_col].to_numpy(dtype='datetime64[ns]')[positions],
+                'direction': df['TransactionDirection'].to_numpy(dtype=object)[positions],
+            }))
+        rows = pd.concat(frames, ignore_index=True)
+
+        if self.tolerance_amount > 0:
+            # Any two rows within the tolerance can meet in the fuzzy tier, whatever their direction
+            rows = rows.sort_values(['paise', 'side', 'position'], kind='mergesort')
+            gap = int(np.ceil(self.tolerance_amount * 100)) + 1
+            rows['cluster'] = (rows['paise'].diff() > gap).cumsum()
+        else:
+            rows = rows[rows['direction'] != 'Unknown'].copy()
+            rows['cluster'] = rows.groupby(['direction', 'paise'], sort=True).ngroup()
+
+        rows = rows.sort_values(['cluster', 'date'], kind='mergesort')
+        halo = pd.Timedelta(days=self.tolerance_days)
+        new_block = (rows['cluster'].diff() != 0) | (rows['date'].diff() > halo)
+        rows['block'] = new_block.cumsum()
+
+        sizes = rows.groupby('block').size().sort_values(ascending=False, kind='mergesort')
+        loads = [0] * parts
+        assignment = {}
+        for block, size in sizes.items():
+            target = loads.index(min(loads))
+            assignment[block] = target
+            loads[target] += size
+        rows['partition'] = rows['block'].map(assignment)
+
+        partitions = []
+        for _, part in rows.groupby('partition'):
+            sms_positions = np.sort(part.loc[part['side'] == 0, 'position'].to_numpy())
+            tally_positions = np.sort(part.loc[part['side'] == 1, 'position'].to_numpy())
+            if len(tally_positions) and len(sms_positions):
+                partitions.append((sms_positions, tally_positions))
+        return partitions
+
+    def _build_candidate_index(self, positions, paise, dates):
+        """Bucket row positions by amount in paise, each bucket sorted by (date, position)"""
+        order = positions[np.lexsort((positions, dates[positions], paise[positions]))]
+        keys, starts = np.unique(paise[order], return_index=True)
+        bounds = np.append(starts, len(order))
+
+        buckets = {}
+        for key, lo, hi in zip(keys.tolist(), bounds[:-1], bounds[1:]):
+            bucket_positions = order[lo:hi]
+            buckets[key] = (bucket_positions, dates[bucket_positions])
+
+        return {'keys': keys, 'buckets': buckets}
+
+    def _probe_candidates(self, candidate_index, amount, date, window_ns, amounts, dates, available):
+        """Return unmatched row positions within tolerance_amount of amount and the date window"""
+        tolerance = self.tolerance_amount
+        if tolerance > 0:
+            # Probe every populated bucket in the tolerance range, one paisa wider on each
+            # side so float rounding never drops a row the exact check below keeps
+            keys = candidate_index['keys']
+            lo = np.searchsorted(keys, int(np.floor((amount - tolerance) * 100)) - 1, side='left')
+            hi = np.searchsorted(keys, int(np.ceil((amount + tolerance) * 100)) + 1, side='right')
+            probe_keys = keys[lo:hi].tolist()
+        else:
+            probe_keys = [int(np.rint(amount * 100))]
+
+        found = []
+        for key in probe_keys:
+            bucket = candidate_index['buckets'].get(key)
+            if bucket is None:
+                continue
+            bucket_positions, bucket_dates = bucket
+            lo = np.searchsorted(bucket_dates, date - window_ns, side='left')
+            hi = np.searchsorted(bucket_dates, date + window_ns, side='right')
+            candidates = bucket_positions[lo:hi]
+            mask = available[candidates]
+            if tolerance > 0:
+                mask &= np.abs(amounts[candidates] - amount) <= tolerance
+            found.append(candidates[mask])
+
+        if not found:
+            return np.empty(0, dtype='int64')
+        return found[0] if len(found) == 1 else np.concatenate(found)
+
+    def _apply_updates(self, df, updates, matched_indices=None):
+        """Write queued column updates in bulk and register the newly tallied rows"""
+        for col, values in updates.items():
+            self._assign_column(df, col, list(values.keys()), list(values.values()))
+        if matched_indices is not None:
+            matched_indices.update(updates.get('Status', {}).keys())
+
+    def _assign_column(self, df, col, index, values):
+        """Set col for the rows in index in one step, widening categories as needed"""
+        if col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                categories = df[col].cat.categories
+                new_categories = [value for value in dict.fromkeys(values)
+                                  if pd.notna(value) and value not in categories]
+                if new_categories:
+                    df[col] = df[col].cat.add_categories(new_categories)
+            df.loc[index, col] = values
+        else:
+            df[col] = pd.Series(values, index=index, dtype=object)
+
+    def _record_match(self, sms_updates, tally_updates, sms_index, tally_index, remarks):
+        """Queue Status and remark writes for a matched SMS/Tally pair"""
+        sms_updates.setdefault('Status', {})[sms_index] = 'Tallied'
+        tally_updates.setdefault('Status', {})[tally_index] = 'Tallied'
+        for col, (sms_remark, tally_remark) in remarks.items():
+            sms_updates.setdefault(col, {})[sms_index] = sms_remark
+            tally_updates.setdefault(col, {})[tally_index] = tally_remark
 
-        return sms_df, tally_df
-    
     def calculate_match_score(self, tally_row, sms_row):
         score = 0
         
@@ -233,22 +1113,361 @@ class SMSTallyAutomation:
         
         return score
     
+    def prepare_score_columns(self, sms_df, vouchers=None):
+        """Precompute the SMS columns calculate_match_scores reads, as plain arrays.
+
+        When vouchers are given, every Description/Remarks is scanned once for all of
+        them, so the voucher-number check becomes a set lookup per candidate.
+        """
+        score_columns = {
+            'description': np.array([str(value) for value in sms_df['Description']], dtype=object),
+            'remarks': np.array([str(value) for value in sms_df['Remarks']], dtype=object),
+            'direction': sms_df['TransactionDirection'].to_numpy(dtype=object),
+            'type': sms_df['Transaction Type'].to_numpy(dtype=object),
+            'voucher_hits': {},
+        }
+
+        if vouchers is not None:
+            scanner = VoucherScanner(v for v in vouchers if pd.notna(v) and v != "NAN")
+            description_hits = scanner.scan_many(score_columns['description'])
+            remark_hits = scanner.scan_many(score_columns['remarks'])
+            score_columns['voucher_hits'] = {
+                voucher: description_hits[voucher] | remark_hits[voucher] for voucher in scanner.patterns
+            }
+
+        return score_columns
+
+    def find_voucher_references(self, sms_df, tally_df):
+        """Return a sparse (sms_index, tally_index) table of SMS rows whose Description
+        or Remarks contain a Tally row's Vch No."""
+        score_columns = self.prepare_score_columns(sms_df, vouchers=tally_df['Vch No.'])
+        voucher_hits = score_columns['voucher_hits']
+
+        pairs = []
+        for tally_index, voucher in tally_df['Vch No.'].items():
+            for s_pos in sorted(voucher_hits.get(voucher, ())):
+                pairs.append((sms_df.index[s_pos], tally_index))
+
+        return pd.DataFrame(pairs, columns=['sms_index', 'tally_index'])
+
+    def calculate_match_scores(self, tally_row, sms_block, score_columns=None):
+        """Score one Tally row against every row of sms_block in a single call.
+
+        Returns a float array equal, element by element, to calculate_match_score.
+        """
+        if score_columns is None:
+            score_columns = self.prepare_score_columns(sms_block)
+        return self._score_candidates(tally_row, score_columns, np.arange(len(sms_block)))
+
+    def _score_candidates(self, tally_row, score_columns, positions):
+        # Terms are added in the same order as calculate_match_score so the floats agree exactly
+        scores = np.where(score_columns['direction'][positions] == tally_row['TransactionDirection'], 20.0, 0.0)
+
+        vch_no = tally_row['Vch No.']
+        if pd.notna(vch_no) and vch_no != "NAN":
+            vch_no = str(vch_no)
+            descriptions = score_columns['description'][positions]
+            remarks = score_columns['remarks'][positions]
+            hits = score_columns['voucher_hits'].get(vch_no)
+            if hits is not None:
+                contains = np.array([position in hits for position in positions], dtype=bool)
+            else:
+                contains = np.array([vch_no in description or vch_no in remark
+                                     for description, remark in zip(descriptions, remarks)], dtype=bool)
+
+            description_scores = np.full(len(positions), 50.0)
+            remark_scores = np.zeros(len(positions))
+            # partial_ratio only runs for the rows without a direct voucher hit
+            for i in np.flatnonzero(~contains):
+                description_scores[i] = fuzz.partial_ratio(vch_no, descriptions[i]) * 0.3
+                remark_scores[i] = fuzz.partial_ratio(vch_no, remarks[i]) * 0.2
+            scores += description_scores
+            scores += remark_scores
+
+        scores += np.where(score_columns['type'][positions] == tally_row['Transaction Type'], 30, 0)
+        return scores
+
     def handle_split_transactions(self, sms_df, tally_df, matched_sms_indices, matched_tally_indices):
+        """Match leftover Tally rows to several SMS rows that add up to the Tally amount.
+
+        Unmatched SMS rows are grouped once by (date, Transaction Type, direction); each
+        unmatched Tally row then searches its group(s) for 2 to split_max_parts rows whose
+        sum is within tolerance_amount (see find_subset_sum). If no such subset exists,
+        the whole group is still accepted when its total matches, as before.
+        """
+        groups = self._build_split_groups(sms_df, 'TransactionDate', matched_sms_indices)
+        if not groups:
+            return
+        searches = self._split_searches()
+
+        tolerance = int(np.floor(self.tolerance_amount * 100 + 1e-6))
+        sms_updates = {}
+        tally_updates = {}
+
         unmatched_tally = tally_df[~tally_df.index.isin(matched_tally_indices)]
-        for idx, tally_row in unmatched_tally.iterrows():
-            potential_splits = sms_df[
-                (sms_df['TransactionDate'] == tally_row['Date']) &
-                (~sms_df.index.isin(matched_sms_indices)) &
-                (sms_df['Transaction Type'] == tally_row['Transaction Type'])
-            ]
-            
-            if not potential_splits.empty and abs(potential_splits['Amount'].sum() - tally_row['Amount']) <= self.tolerance_amount:
-                tally_df.at[idx, 'Status'] = 'Tallied'
-                matched_tally_indices.add(idx)
-                for split_idx in potential_splits.index:
-                    sms_df.at[split_idx, 'Status'] = 'Tallied'
-                    matched_sms_indices.add(split_idx)
-    
+        directions = (unmatched_tally['TransactionDirection'] if 'TransactionDirection' in unmatched_tally.columns
+                      else [None] * len(unmatched_tally))
+        for idx, date, ttype, direction, amount, vch_no in zip(
+                unmatched_tally.index, unmatched_tally['Date'], unmatched_tally['Transaction Type'], directions,
+                unmatched_tally['Amount'], unmatched_tally['Vch No.']):
+            if pd.isna(date) or pd.isna(amount):
+                continue
+
+            parts = self._find_split(groups, searches, date, ttype, direction, amount, tolerance)
+            if parts is None:
+                continue
+
+            split_labels = [label for _, label, _ in parts]
+            tally_updates.setdefault('Status', {})[idx] = 'Tallied'
+            tally_updates.setdefault('MatchRemarks', {})[idx] = (
+                f"Split match with {len(parts)} SMS: Amounts {' + '.join(str(sms_df.at[label, 'Amount']) for label in split_labels)}"
+            )
+            for sms_idx in split_labels:
+                sms_updates.setdefault('Status', {})[sms_idx] = 'Tallied'
+                self.match_pairs.append((sms_idx, idx, 'split'))
+                sms_updates.setdefault('MatchRemarks', {})[sms_idx] = (
+                    f"Part of split match with Tally: Vch No. {vch_no}, Amount {amount}, "
+                    f"Date {date.strftime('%d-%b-%Y')}"
+                )
+
+        self._apply_updates(sms_df, sms_updates, matched_sms_indices)
+        self._apply_updates(tally_df, tally_updates, matched_tally_indices)
+
+    def handle_reverse_split_transactions(self, sms_df, tally_df, matched_sms_indices, matched_tally_indices):
+        """Match leftover SMS rows to several Tally vouchers that add up to the SMS amount.
+
+        The mirror image of handle_split_transactions, for consolidated payments: open
+        Tally rows are grouped by (date, Transaction Type, direction) and searched with
+        the same bounded subset-sum. The SMS row's MatchRemarks lists the vouchers.
+        """
+        groups = self._build_split_groups(tally_df, 'Date', matched_tally_indices)
+        if not groups:
+            return
+        searches = self._split_searches()
+
+        tolerance = int(np.floor(self.tolerance_amount * 100 + 1e-6))
+        sms_updates = {}
+        tally_updates = {}
+
+        unmatched_sms = sms_df[~sms_df.index.isin(matched_sms_indices)]
+        directions = (unmatched_sms['TransactionDirection'] if 'TransactionDirection' in unmatched_sms.columns
+                      else [None] * len(unmatched_sms))
+        for idx, date, ttype, direction, amount in zip(
+                unmatched_sms.index, unmatched_sms['TransactionDate'], unmatched_sms['Transaction Type'], directions,
+                unmatched_sms['Amount']):
+            if pd.isna(date) or pd.isna(amount):
+                continue
+
+            parts = self._find_split(groups, searches, date, ttype, direction, amount, tolerance)
+            if parts is None:
+                continue
+
+            split_labels = [label for _, label, _ in parts]
+            sms_updates.setdefault('Status', {})[idx] = 'Tallied'
+            sms_updates.setdefault('MatchRemarks', {})[idx] = (
+                f"Reverse split match with {len(parts)} Tally: Vch No. {', '.join(str(tally_df.at[label, 'Vch No.']) for label in split_labels)}"
+            )
+            for tally_idx in split_labels:
+                tally_updates.setdefault('Status', {})[tally_idx] = 'Tallied'
+                self.match_pairs.append((idx, tally_idx, 'reverse_split'))
+                tally_updates.setdefault('MatchRemarks', {})[tally_idx] = (
+                    f"Part of reverse split match with SMS: Amount {amount}, "
+                    f"Date {date.strftime('%d-%b-%Y')}"
+                )
+
+        self._apply_updates(sms_df, sms_updates, matched_sms_indices)
+        self._apply_updates(tally_df, tally_updates, matched_tally_indices)
+
+    def _build_split_groups(self, df, date_col, matched_indices):
+        """Group unmatched rows by (date, Transaction Type, direction) for split matching.
+
+        Each group is a list of (amount in paise, index label, frame position), sorted by
+        amount and then position so searches are deterministic.
+        """
+        open_rows = ~df.index.isin(matched_indices) & df[date_col].notna().to_numpy() & df['Amount'].notna().to_numpy()
+        if 'TransactionDirection' in df.columns:
+            open_rows &= (df['TransactionDirection'] != 'Unknown').to_numpy()
+        positions = np.flatnonzero(open_rows)
+        if not len(positions):
+            return {}
+
+        dates = df[date_col].to_numpy(dtype='datetime64[ns]')[positions].astype('datetime64[D]')
+        types = df['Transaction Type'].to_numpy(dtype=object)[positions]
+        directions = (df['TransactionDirection'].to_numpy(dtype=object)[positions]
+                      if 'TransactionDirection' in df.columns else np.full(len(positions), None))
+        paise = np.rint(np.abs(df['Amount'].to_numpy(dtype='float64')[positions]) * 100).astype('int64')
+
+        groups = {}
+        for position, date, ttype, direction, amount in zip(positions.tolist(), dates, types, directions, paise.tolist()):
+            groups.setdefault((date, ttype, direction), []).append((amount, df.index[position], position))
+        for members in groups.values():
+            members.sort(key=lambda member: (member[0], member[2]))
+        return groups
+
+    def _split_searches(self):
+        """Search state for one split pass: its overall deadline and, per window of
+        group keys, a shared deadline and the pair sums of the window's members"""
+        return {'deadline': time.perf_counter() + self.split_total_budget, 'windows': {}}
+
+    def _find_split(self, groups, searches, date, ttype, direction, amount, tolerance):
+        """Find and remove the group members that make up amount, or return None"""
+        day = np.datetime64(pd.Timestamp(date).normalize(), 'D')
+        window = [day + np.timedelta64(offset, 'D')
+                  for offset in range(-self.split_tolerance_days, self.split_tolerance_days + 1)]
+        keys = [key for key in ((d, ttype, direction) for d in window) if groups.get(key)]
+        if not keys:
+            return None
+
+        search = self._split_window(searches, groups, keys)
+        members, amounts = search['members'], search['amounts']
+        target = int(np.rint(abs(amount) * 100))
+        chosen = self.find_subset_sum(amounts, target, tolerance, self.split_max_parts,
+                                      min(search['deadline'], searches['deadline']), search['pair_sums'])
+        if chosen is None:
+            # Fall back to the whole group adding up, however many rows it has
+            if len(members) < 2 or abs(sum(amounts) - target) > tolerance:
+                return None
+            chosen = range(len(members))
+
+        parts = [members[i] for i in chosen]
+        used = {member[2] for member in parts}
+        for key in keys:
+            groups[key] = [member for member in groups[key] if member[2] not in used]
+        return parts
+
+    def _split_window(self, searches, groups, keys):
+        """The search state of a window of group keys: its members sorted by amount, their
+        pair sums and the time budget every voucher searching the window shares"""
+        search = searches['windows'].setdefault(tuple(keys), {
+            'deadline': time.perf_counter() + self.split_time_budget,
+            'size': None, 'members': None, 'amounts': None, 'pair_sums': None,
+        })
+        # Members are only ever removed, so an unchanged count means an unchanged window
+        size = sum(len(groups[key]) for key in keys)
+        if search['size'] == size:
+            return search
+
+        previous = search['members']
+        members = sorted((member for key in keys for member in groups[key]), key=lambda member: (member[0], member[2]))
+        amounts = [member[0] for member in members]
+        pair_sums = None
+        if 3 <= len(members) <= self.SPLIT_PAIR_INDEX_MAX_ROWS:
+            if search['pair_sums'] is None:
+                pair_sums = self.pair_sums(amounts)
+            else:
+                # Drop the pairs of removed members and renumber the rest
+                keep = np.isin([member[2] for member in previous], [member[2] for member in members])
+                renumber = np.cumsum(keep) - 1
+                values, sums, first, second = search['pair_sums']
+                live = keep[first] & keep[second]
+                pair_sums = (values[keep], sums[live], renumber[first[live]], renumber[second[live]])
+        search.update(size=size, members=members, amounts=amounts, pair_sums=pair_sums)
+        return search
+
+    def pair_sums(self, amounts):
+        """Sums of every pair of amounts, sorted, with the two indices that make each up.
+
+        Returns (amounts as an array, sums, first indices, second indices).
+        """
+        values = np.asarray(amounts, dtype='int64')
+        first, second = np.triu_indices(len(values), 1)
+        sums = values[first] + values[second]
+        order = np.argsort(sums, kind='stable')
+        return values, sums[order], first[order], second[order]
+
+    def find_subset_sum(self, amounts, target, tolerance, max_parts, deadline=None, pair_sums=None):
+        """Return indices of 2 to max_parts amounts whose sum is within tolerance of target.
+
+        amounts must be non-negative integers sorted ascending. Fewer parts are preferred.
+        With pair_sums (from pair_sums(amounts)), 2 to 4 parts are looked up by binary
+        search in the sorted pair sums: a pair directly, then meet-in-the-middle as one
+        amount plus a pair or a pair plus a pair. Without it, pairs are found with a
+        binary search for the second part and more parts with a depth-first search
+        that prunes on prefix sums. Only the pair lookup (a single binary search)
+        ignores deadline; every longer search gives up, returning None, once
+        time.perf_counter() passes it.
+        """
+        n = len(amounts)
+        prefix = []
+
+        def search(start, parts, remaining, deadline):
+            if parts == 1:
+                pos = bisect_left(amounts, remaining - tolerance, start)
+                if pos < n and amounts[pos] <= remaining + tolerance:
+                    return [pos]
+                return None
+            for i in range(start, n - parts + 1):
+                if deadline is not None and time.perf_counter() > deadline:
+                    raise TimeoutError
+                # The smallest sum from here on is already too large
+                if prefix[i + parts] - prefix[i] > remaining + tolerance:
+                    break
+                # Even with the largest remaining parts this amount falls short
+                if amounts[i] + prefix[n] - prefix[n - parts + 1] < remaining - tolerance:
+                    continue
+                # An equal amount was already tried at this depth
+                if i > start and amounts[i] == amounts[i - 1]:
+                    continue
+                rest = search(i + 1, parts - 1, remaining - amounts[i], deadline)
+                if rest is not None:
+                    return [i] + rest
+            return None
+
+        for parts in range(2, min(max_parts, n) + 1):
+            # No parts-sized subset can reach the target from here on
+            if sum(amounts[:parts]) > target + tolerance:
+                break
+            if sum(amounts[n - parts:]) < target - tolerance:
+                continue
+            try:
+                if parts > 2 and deadline is not None and time.perf_counter() > deadline:
+                    raise TimeoutError
+                if parts <= 4 and pair_sums is not None:
+                    found = self._meet_in_the_middle(target, tolerance, parts, pair_sums,
+                                                     deadline if parts > 2 else None)
+                else:
+                    if not prefix:
+                        prefix.append(0)
+                        for value in amounts:
+                            prefix.append(prefix[-1] + value)
+                    found = search(0, parts, target, deadline if parts > 2 else None)
+            except TimeoutError:
+                return None
+            if found is not None:
+                return sorted(found)
+        return None
+
+    def _meet_in_the_middle(self, target, tolerance, parts, pair_sums, deadline=None):
+        """Find 2 (a pair), 3 (one amount and a pair) or 4 (two pairs) distinct amounts adding up to target.
+
+        The left halves are looked up SPLIT_LOOKUP_CHUNK at a time, raising TimeoutError
+        once time.perf_counter() passes deadline.
+        """
+        values, sums, first, second = pair_sums
+        if parts == 2:
+            low = np.searchsorted(sums, target - tolerance, side='left')
+            if low < len(sums) and sums[low] <= target + tolerance:
+                return [int(first[low]), int(second[low])]
+            return None
+        if parts == 3:
+            lefts = values
+        else:
+            # One of the two pairs is at most half the total, so only those lead
+            lefts = sums[:np.searchsorted(sums, (target + tolerance) // 2, side='right')]
+        for start in range(0, len(lefts), self.SPLIT_LOOKUP_CHUNK):
+            if deadline is not None and time.perf_counter() > deadline:
+                raise TimeoutError
+            needed = target - lefts[start:start + self.SPLIT_LOOKUP_CHUNK]
+            low = np.searchsorted(sums, needed - tolerance, side='left')
+            high = np.searchsorted(sums, needed + tolerance, side='right')
+            for offset in np.flatnonzero(high > low).tolist():
+                left = start + offset
+                chosen = {left} if parts == 3 else {int(first[left]), int(second[left])}
+                for pair in range(low[offset], high[offset]):
+                    if int(first[pair]) not in chosen and int(second[pair]) not in chosen:
+                        return list(chosen | {int(first[pair]), int(second[pair])})
+        return None
+
     def mark_as_tallied(self, tally_row, sms_row, sms_df, tally_df, matched_sms_indices, matched_tally_indices):
         sms_df_index = sms_row.name
         tally_df_index = tally_row.name
@@ -258,17 +1477,30 @@ class SMSTallyAutomation:
         tally_df.at[tally_df_index, 'Status'] = 'Tallied'
         
         # Add matching details
-        date_diff = abs((sms_row['TransactionDate'] - tally_row['Date']).days)
-        direction = "same" if sms_row['TransactionDirection'] == tally_row['TransactionDirection'] else "different"
-        
-        sms_df.at[sms_df_index, 'MatchDetails'] = f"Amount: {tally_row['Amount']}, Date diff: {date_diff} days, Direction: {direction}"
-        tally_df.at[tally_df_index, 'MatchDetails'] = f"Amount: {sms_row['Amount']}, Date diff: {date_diff} days, Direction: {direction}"
+        sms_details, tally_details = self._match_details(tally_row, sms_row)
+        sms_df.at[sms_df_index, 'MatchDetails'] = sms_details
+        tally_df.at[tally_df_index, 'MatchDetails'] = tally_details
 
         matched_sms_indices.add(sms_df_index)
+        self.match_pairs.append((sms_df_index, tally_df_index, 'fuzzy'))
         matched_tally_indices.add(tally_df_index)
     
+    def _match_details(self, tally_row, sms_row):
+        """Build the (SMS, Tally) MatchDetails text for a scored match"""
+        date_diff = abs((sms_row['TransactionDate'] - tally_row['Date']).days)
+        direction = "same" if sms_row['TransactionDirection'] == tally_row['TransactionDirection'] else "different"
+
+        return (
+            f"Amount: {tally_row['Amount']}, Date diff: {date_diff} days, Direction: {direction}",
+            f"Amount: {sms_row['Amount']}, Date diff: {date_diff} days, Direction: {direction}",
+        )
+
     def check_gst_for_service_claims(self, df, gst_files):
-        """Check GST files for service claim transactions"""
+        """Check GST files for service claim transactions.
+
+        gst_files is a list of uploads or a GSTReference from load_gst_reference;
+        pass the reference when checking more than one ledger against the same files.
+        """
         if not gst_files:
             return df
         
@@ -279,63 +1511,137 @@ class SMSTallyAutomation:
         if service_claims.empty:
             return df
         
-        # Load all GST files once and cache them
-        gst_data_cache = []
-        for gst_file in gst_files:
-            try:
-                gst_df = self.read_excel_file(gst_file)
-                # Pre-process GST data for faster searching
-                processed_gst = self.preprocess_gst_data(gst_df, gst_file)
-                if processed_gst:
-                    gst_data_cache.append(processed_gst)
-            except Exception as e:
-                continue
-        
-        if not gst_data_cache:
+        gst_reference = gst_files if isinstance(gst_files, GSTReference) else self.load_gst_reference(gst_files)
+        if not len(gst_reference):
             return df
         
-        # Process each service claim
-        for idx, row in service_claims.iterrows():
-            amount = row['Amount']
-            date = row['TransactionDate'] if 'TransactionDate' in row else row['Date']
-            year = date.year if pd.notna(date) else None
-            
-            if pd.isna(amount) or year is None:
-                df.at[idx, 'GST Status'] = "Invalid Date/Amount"
-                continue
-            
-            found_in_gst = False
-            gst_year = None
-            
-            # Check all cached GST data
-            for gst_data in gst_data_cache:
-                gst_amount_found, found_year = self.check_cached_gst_data(gst_data, amount, year)
-                if gst_amount_found:
-                    found_in_gst = True
-                    gst_year = found_year
-                    break
-            
-            if found_in_gst and gst_year:
-                df.at[idx, 'GST Status'] = f"Found in GST {gst_year}"
-            else:
-                df.at[idx, 'GST Status'] = "Not Found in GST"
+        # Resolve every claim at once: a nearest-amount join per claim year
+        amounts = service_claims['Amount'].to_numpy(dtype='float64', na_value=np.nan)
+        date_col = 'TransactionDate' if 'TransactionDate' in service_claims.columns else 'Date'
+        years = pd.to_datetime(service_claims[date_col], errors='coerce').dt.year.to_numpy(dtype='float64', na_value=np.nan)
+        valid = ~np.isnan(amounts) & ~np.isnan(years)
+        
+        found = np.zeros(len(service_claims), dtype=bool)
+        keyed = np.zeros(len(service_claims), dtype=bool)
+        scoped = np.zeros(len(service_claims), dtype=bool)
+        invoice_nos = np.full(len(service_claims), None, dtype=object)
+        if self.gst_mode == 'keyed':
+            found, keyed, scoped, invoice_nos = self._match_gst_invoices(service_claims, amounts, years, gst_reference)
+            found &= valid
+            keyed &= valid
         
+        # Claims that name no known invoice or supplier fall back to the amount scan
+        fallback = valid & ~keyed & ~scoped & ~found
+        found[fallback], invoice_nos[fallback] = gst_reference.match_amounts(
+            amounts[fallback], years[fallback], self.tolerance_amount)
+        invoice_nos[~found] = None
+        
+        year_labels = np.nan_to_num(years).astype(int).astype(str)
+        statuses = np.select(
+            [~valid, found, keyed],
+            ["Invalid Date/Amount", np.char.add("Found in GST ", year_labels), "Invoice Amount Mismatch"],
+            "Not Found in GST"
+        ).astype(object)
+        
+        self._assign_column(df, 'GST Status', service_claims.index, statuses)
+        self._assign_column(df, 'GST Invoice', service_claims.index, invoice_nos)
         return df
     
+    def _match_gst_invoices(self, claims, amounts, years, gst_reference):
+        """Join claims to GST invoices on invoice number, then GSTIN, found in their text.
+
+        Invoice keys are the claim's reference tokens (at least 4 characters with a
+        digit, punctuation removed); a GSTIN in the claim narrows its invoice hits to
+        that supplier. A candidate confirms the claim when its amount is within
+        tolerance_amount and its year is unknown or the claim's. An invoice-number hit
+        only counts (keyed) when it confirms the claim or comes from the GSTIN the claim
+        names; a bare number can be anyone's. Claims with a GSTIN but no keyed hit are
+        joined on the GSTIN alone, and are scoped to that supplier's invoices when the
+        GST files carry GSTINs.
+
+        Returns (found, keyed, scoped, invoice_nos): confirmed claims, claims whose
+        invoice was identified (so an unconfirmed one is an amount mismatch), claims
+        limited to their supplier (neither may fall back to the amount scan over every
+        supplier), and the confirming invoice's number.
+        """
+        found = np.zeros(len(claims), dtype=bool)
+        keyed = np.zeros(len(claims), dtype=bool)
+        scoped = np.zeros(len(claims), dtype=bool)
+        invoice_nos = np.full(len(claims), None, dtype=object)
+        invoices = gst_reference.invoices()
+        columns = [col for col in self.GST_CLAIM_REFERENCE_COLUMNS if col in claims.columns]
+        if invoices.empty or not columns:
+            return found, keyed, scoped, invoice_nos
+
+        text = claims[columns[0]].astype(str)
+        for col in columns[1:]:
+            text = text + ' ' + claims[col].astype(str)
+        text = text.str.upper().reset_index(drop=True)
+        gstins = text.str.extract(self.GSTIN_PATTERN, expand=False)
+
+        tokens = text.str.split(r'[\s,;:()#]+', regex=True).explode()
+        tokens = tokens.str.replace('[^A-Z0-9]', '', regex=True)
+        tokens = tokens[(tokens.str.len() >= 4) & tokens.str.contains('[0-9]', regex=True)]
+        tokens = pd.DataFrame({'claim': tokens.index, 'invoice_key': tokens.to_numpy()}).drop_duplicates()
+
+        def confirm(candidates):
+            claim = candidates['claim'].to_numpy()
+            amount_ok = np.abs(candidates['amount'].to_numpy(dtype='float64') - amounts[claim]) <= self.tolerance_amount
+            invoice_years = candidates['year'].to_numpy(dtype='float64')
+            year_ok = np.isnan(invoice_years) | (invoice_years == years[claim])
+            confirmed = amount_ok & year_ok
+            found[claim[confirmed]] = True
+            invoice_nos[claim[confirmed]] = candidates['invoice_no'].to_numpy(dtype=object)[confirmed]
+            return confirmed
+
+        # Hash join on invoice number, keeping only the claim's supplier when it names one
+        candidates = tokens.merge(invoices[invoices['invoice_key'].notna()], on='invoice_key')
+        claim_gstins = gstins.to_numpy(dtype=object)[candidates['claim'].to_numpy()]
+        candidate_gstins = candidates['gstin'].to_numpy(dtype=object)
+        same_supplier = pd.isna(claim_gstins) | pd.isna(candidate_gstins) | (candidate_gstins == claim_gstins)
+        named_supplier = ~pd.isna(claim_gstins) & (candidate_gstins == claim_gstins)
+        confirmed = confirm(candidates[same_supplier])
+        keyed[candidates['claim'].to_numpy()[same_supplier][confirmed | named_supplier[same_supplier]]] = True
+
+        # Then on GSTIN alone for claims whose tokens named no invoice
+        has_gstin = gstins.notna().to_numpy()
+        by_gstin = gstins[~keyed & has_gstin]
+        if len(by_gstin):
+            candidates = pd.DataFrame({'claim': by_gstin.index, 'gstin': by_gstin.to_numpy()}).merge(
+                invoices[invoices['gstin'].notna()], on='gstin')
+            confirm(candidates)
+        if invoices['gstin'].notna().any():
+            scoped = has_gstin & ~keyed
+
+        return found, keyed, scoped, invoice_nos
+
+    def load_gst_reference(self, gst_files):
+        """Read and index every GST file once, side by side, into a GSTReference.
+
+        Each upload is read from an in-memory copy of its bytes, so the handles can be
+        reused afterwards whatever position they were left at. Files that can't be
+        read or have no invoice value column are skipped.
+        """
+        def load_gst(gst_file):
+            try:
+                name = gst_file.name if hasattr(gst_file, 'name') else os.path.basename(str(gst_file))
+                upload = self._named_buffer(self._file_bytes(gst_file), name)
+                gst_df = self.read_excel_file(upload)
+                # Pre-process GST data for faster searching
+                return name, self.preprocess_gst_data(gst_df, upload)
+            except Exception as e:
+                return None, None
+
+        gst_files = list(gst_files or [])
+        with ThreadPoolExecutor(max_workers=max(1, min(len(gst_files), self.workers or os.cpu_count() or 1))) as executor:
+            loaded = [(name, processed_gst) for name, processed_gst in executor.map(load_gst, gst_files) if processed_gst]
+        return GSTReference([processed_gst for _, processed_gst in loaded], sources=[name for name, _ in loaded])
+    
     def preprocess_gst_data(self, gst_df, file):
         """Preprocess GST data for faster searching"""
         try:
             # Find amount column
-            amount_col = None
-            possible_amount_cols = ['INVOICE VALUE', 'INVOICE VALUE(₹)', 'Invoice Value', 
-                                   'Invoice Value(₹)', 'Invoice Value (₹)', 'InvoiceValue']
-            for col in gst_df.columns:
-                for possible_col in possible_amount_cols:
-                    if possible_col.upper() in col.upper():
-                        amount_col = col
-                        break
-                if amount_col:
-                    break
+            amount_col = self._gst_column(gst_df.columns, self.GST_AMOUNT_COLUMNS)
             
             if not amount_col:
                 return None
@@ -375,34 +1681,78 @@ class SMSTallyAutomation:
                 else:
                     gst_df['Year'] = None
             
+            # Invoice amounts sorted overall and per year, with the invoice numbers in the same order
+            amounts = gst_df[amount_col].to_numpy(dtype='float64', na_value=np.nan)
+            years = pd.to_numeric(gst_df['Year'], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            invoice_col = self._gst_column([str(col) for col in gst_df.columns], self.GST_INVOICE_COLUMNS)
+            invoice_nos = None if invoice_col is None else \
+                gst_df[invoice_col].astype(str).where(gst_df[invoice_col].notna(), None).to_numpy(dtype=object)
+            valid = ~np.isnan(amounts)
+            present_years = np.unique(years[~np.isnan(years)])
+            
+            def sort_by_amount(rows):
+                order = np.argsort(amounts[rows], kind='stable')
+                return amounts[rows][order], None if invoice_nos is None else invoice_nos[rows][order]
+            
+            overall = sort_by_amount(valid)
+            by_year = {int(year): sort_by_amount(valid & (years == year)) for year in present_years}
+            
             return {
                 'data': gst_df,
                 'amount_col': amount_col,
-                'date_col': date_col
+                'date_col': date_col,
+                'amounts': overall[0],
+                'amounts_by_year': {year: sorted_year[0] for year, sorted_year in by_year.items()},
+                'invoice_nos': overall[1],
+                'invoice_nos_by_year': None if invoice_nos is None else
+                    {year: sorted_year[1] for year, sorted_year in by_year.items()},
+                'years': set(int(year) for year in present_years),
+                'has_years': len(present_years) > 0,
+                'invoices': self._gst_invoice_table(gst_df, amounts, years),
             }
         except Exception as e:
             return None
     
+    def _gst_column(self, columns, aliases):
+        """First column whose name contains one of aliases (case-insensitive), or None"""
+        for col in columns:
+            for possible_col in aliases:
+                if possible_col.upper() in col.upper():
+                    return col
+        return None
+
+    def _gst_invoice_table(self, gst_df, amounts, years):
+        """Invoice number / GSTIN keys of a GST file with each invoice's amount and year,
+        or None when the file has neither column"""
+        invoice_col = self._gst_column([str(col) for col in gst_df.columns], self.GST_INVOICE_COLUMNS)
+        gstin_col = self._gst_column([str(col) for col in gst_df.columns], self.GST_GSTIN_COLUMNS)
+        if invoice_col is None and gstin_col is None:
+            return None
+
+        def keys(col):
+            if col is None:
+                return pd.Series(None, index=gst_df.index, dtype=object)
+            text = gst_df[col].astype(str).str.upper().str.replace('[^A-Z0-9]', '', regex=True)
+            return text.where(gst_df[col].notna() & (text != ''), None)
+
+        table = pd.DataFrame({
+            'invoice_key': keys(invoice_col),
+            'invoice_no': gst_df[invoice_col].astype(str) if invoice_col is not None else None,
+            'gstin': keys(gstin_col),
+            'amount': amounts,
+            'year': years,
+        })
+        return table[table['invoice_key'].notna() | table['gstin'].notna()].reset_index(drop=True)
+
     def check_cached_gst_data(self, gst_data, amount, year):
         """Check cached GST data for matching amount and year"""
-        gst_df = gst_data['data']
-        amount_col = gst_data['amount_col']
-        
-        if amount_col not in gst_df.columns:
-            return False, None
-        
-        # Check if amount matches
-        if 'Year' in gst_df.columns and gst_df['Year'].notna().any():
-            # Filter by year first for faster matching
-            year_matches = gst_df[gst_df['Year'] == year]
-            if not year_matches.empty:
-                amount_matches = year_matches[abs(year_matches[amount_col] - amount) <= self.tolerance_amount]
-            else:
-                amount_matches = gst_df[abs(gst_df[amount_col] - amount) <= self.tolerance_amount]
+        # Search that year's invoices if the file has any, otherwise all of them
+        if gst_data['has_years'] and year in gst_data['years']:
+            sorted_amounts = gst_data['amounts_by_year'].get(year, np.empty(0))
         else:
-            amount_matches = gst_df[abs(gst_df[amount_col] - amount) <= self.tolerance_amount]
+            sorted_amounts = gst_data['amounts']
         
-        if not amount_matches.empty:
+        if GSTReference.within(sorted_amounts, np.array([amount], dtype='float64'), self.tolerance_amount)[0]:
             return True, year
         
         return False, None
@@ -423,4 +1773,9 @@ class SMSTallyAutomation:
             'total_tally_sum': tally_df['Amount'].sum(),
         }
         
-        return stats
\ No newline at end of file
+        return stats
+
+
+def _match_partition(settings, sms_df, tally_df):
+    """Process-pool entry point: run the indexed engine on one partition"""
+    return SMSTallyAutomation(**settings)._find_indexed_matches(sms_df, tally_df)
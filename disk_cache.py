@@ -0,0 +1,89 @@
+# disk_cache.py
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from upload_cache import ParsedUploadCache
+
+
+class DiskFrameCache:
+    """Persistent on-disk cache of parsed workbooks, keyed by the file's content hash.
+
+    Frames are stored as uncompressed Arrow IPC (Feather v2) files, the on-disk
+    sibling of Parquet that can be memory-mapped, so a repeat upload of the same
+    bytes loads without decoding. Once the directory grows past max_bytes the
+    oldest files are removed first.
+    """
+
+    SUFFIX = '.arrow'
+
+    def __init__(self, directory="file_cache", max_bytes=2 * 1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def get_or_parse(self, file, kind, parse, version=None):
+        """Return the cached frame for file, parsing it with parse(file) and storing it on a miss"""
+        path = os.path.join(self.directory, f"{ParsedUploadCache.content_hash(file)}-{kind}-v{version}{self.SUFFIX}")
+
+        if os.path.exists(path):
+            try:
+                # Text columns were Arrow-backed when stored; keep them that way. Columns
+                # converted zero-copy would stay backed by the read-only mapping, and
+                # matching writes Status in place, so hand out a writable copy
+                with pd.option_context('mode.string_storage', 'pyarrow'):
+                    return feather.read_table(path, memory_map=True).to_pandas().copy()
+            except Exception:
+                # A truncated or unreadable entry is simply rebuilt
+                os.remove(path)
+
+        df = parse(file)
+        self._store(df, path)
+        return df
+
+    def _store(self, df, path):
+        temp_path = None
+        try:
+            handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            os.close(handle)
+            feather.write_feather(df.reset_index(drop=True), temp_path, compression='uncompressed')
+            os.replace(temp_path, path)
+        except Exception:
+            # Frames Arrow can't represent (e.g. mixed-type columns) are just not cached
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def size_bytes(self):
+        return sum(os.path.getsize(os.path.join(self.directory, name))
+                   for name in os.listdir(self.directory) if name.endswith(self.SUFFIX))
+
+    def purge(self):
+        """Delete every cached file"""
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX) or name.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,241 @@
+# file_readers.py
+import csv
+import io
+import os
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Rows per chunk when streaming an export with iter_chunks
+CSV_CHUNK_ROWS = 100000
+
+EXCEL_FORMATS = ('xlsx', 'xlsm', 'xls')
+# Columns read_tally_xml produces, matching a Tally Excel daybook
+TALLY_XML_COLUMNS = ['Date', 'Particulars', 'Vch Type', 'Vch No.', 'Debit', 'Credit', 'Notes']
+SUPPORTED_FORMATS = EXCEL_FORMATS + ('csv', 'parquet', 'xml')
+
+
+def detect_format(file):
+    """Return 'xlsx', 'xlsm', 'xls', 'csv', 'parquet' or 'xml' for an upload or path.
+
+    The extension decides when it is known; otherwise the first bytes are sniffed.
+    """
+    name = file.name if hasattr(file, 'name') else str(file)
+    extension = os.path.splitext(name)[1].lower().lstrip('.')
+    if extension in SUPPORTED_FORMATS:
+        return extension
+
+    head = _peek(file, 8)
+    if head.startswith(b'PAR1'):
+        return 'parquet'
+    if head.startswith(b'PK'):
+        return 'xlsx'
+    if head.startswith(b'\xd0\xcf\x11\xe0'):
+        return 'xls'
+    stripped = head.lstrip(b'\xef\xbb\xbf\xff\xfe\x00 \r\n\t')
+    if stripped.startswith(b'<'):
+        return 'xml'
+    return 'csv'
+
+
+def read_csv(file, columns=None, dtype=None):
+    """Read a CSV export in one pass, keeping only `columns` when given"""
+    usecols = None
+    if columns is not None:
+        wanted = set(columns)
+        usecols = lambda col: str(col).strip() in wanted
+    try:
+        return pd.read_csv(_rewind(file), usecols=usecols, dtype=dtype, low_memory=False)
+    except (ValueError, TypeError):
+        # A declared dtype didn't fit the data; read the same columns untyped
+        return pd.read_csv(_rewind(file), usecols=usecols, low_memory=False)
+
+
+def read_parquet(file, columns=None):
+    """Read a Parquet file, loading only the requested columns that exist in it"""
+    if columns is not None:
+        available = pq.ParquetFile(_rewind(file)).schema_arrow.names
+        columns = [col for col in available if str(col).strip() in set(columns)]
+    return pd.read_parquet(_rewind(file), columns=columns)
+
+
+def read_head(file, nrows, sheet_name=0):
+    """Return the first nrows raw rows of an upload, header included, with no header applied.
+
+    Only the start of the file is read: a byte prefix for CSV, the schema for
+    Parquet (a single row of column names) and the first voucher for Tally XML.
+    """
+    file_format = detect_format(file)
+
+    if file_format == 'csv':
+        text = _peek(file, 1024 * 1024).decode('utf-8-sig', errors='replace')
+        rows = list(csv.reader(io.StringIO(text)))[:nrows]
+        return pd.DataFrame(rows)
+
+    if file_format == 'parquet':
+        return pd.DataFrame([pq.ParquetFile(_rewind(file)).schema_arrow.names])
+
+    if file_format == 'xml':
+        for _, elem in ET.iterparse(_rewind(file), events=('end',)):
+            if elem.tag == 'VOUCHER':
+                return pd.DataFrame([TALLY_XML_COLUMNS])
+        return pd.DataFrame()
+
+    return pd.read_excel(_rewind(file), sheet_name=sheet_name, header=None, nrows=nrows)
+
+
+def iter_chunks(file, columns=None, dtype=None, chunk_rows=CSV_CHUNK_ROWS):
+    """Yield an upload as DataFrames of at most chunk_rows rows, without loading it whole.
+
+    CSV is read with a chunked parser, Parquet by record batch and .xlsx/.xlsm
+    through openpyxl's read-only row stream. Legacy .xls and XML have no streaming
+    reader, so they are read once and handed out in slices.
+    """
+    wanted = None if columns is None else set(columns)
+    file_format = detect_format(file)
+
+    if file_format == 'csv':
+        usecols = None if wanted is None else (lambda col: str(col).strip() in wanted)
+        for chunk in pd.read_csv(_rewind(file), chunksize=chunk_rows, usecols=usecols, dtype=str, low_memory=False):
+            yield _apply_dtypes(chunk, dtype)
+        return
+
+    if file_format == 'parquet':
+        parquet_file = pq.ParquetFile(_rewind(file))
+        batch_columns = None if wanted is None else \
+            [col for col in parquet_file.schema_arrow.names if str(col).strip() in wanted]
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=batch_columns):
+            yield batch.to_pandas()
+        return
+
+    if file_format in ('xlsx', 'xlsm'):
+        import openpyxl
+        workbook = openpyxl.load_workbook(_rewind(file), read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            header = [str(col).strip() if col is not None else '' for col in header]
+            keep = [pos for pos, col in enumerate(header) if wanted is None or col in wanted]
+            names = [header[pos] for pos in keep]
+            batch = []
+            for row in rows:
+                batch.append([row[pos] if pos < len(row) else None for pos in keep])
+                if len(batch) >= chunk_rows:
+                    yield _apply_dtypes(pd.DataFrame(batch, columns=names), dtype)
+                    batch = []
+            if batch:
+                yield _apply_dtypes(pd.DataFrame(batch, columns=names), dtype)
+        finally:
+            workbook.close()
+        return
+
+    df = read_tally_xml(file) if file_format == 'xml' else pd.read_excel(_rewind(file))
+    if wanted is not None:
+        df = df[[col for col in df.columns if str(col).strip() in wanted]]
+    for start in range(0, len(df), chunk_rows):
+        yield _apply_dtypes(df.iloc[start:start + chunk_rows].reset_index(drop=True), dtype)
+
+
+def read_tally_xml(file):
+    """Stream a Tally daybook XML export into the columns of a Tally Excel daybook.
+
+    Each VOUCHER becomes one row: Date, Particulars (party ledger), Vch Type,
+    Vch No., Debit/Credit from the party ledger entry (Tally writes debits as
+    negative amounts) and Notes (narration). Every element is detached from its
+    parent once it has been read, so the tree never grows past the elements still
+    open and memory stays flat however large the export is.
+    """
+    rows = []
+    open_elems = []
+    open_vouchers = 0
+    for event, elem in ET.iterparse(_rewind(file), events=('start', 'end')):
+        if event == 'start':
+            open_elems.append(elem)
+            open_vouchers += elem.tag == 'VOUCHER'
+            continue
+        open_elems.pop()
+        if elem.tag != 'VOUCHER':
+            # Voucher children are read (and dropped) with their voucher
+            if not open_vouchers and open_elems:
+                open_elems[-1].remove(elem)
+            continue
+        open_vouchers -= 1
+
+        party = _text(elem, 'PARTYLEDGERNAME')
+        amount = None
+        for entry in list(elem.iter('ALLLEDGERENTRIES.LIST')) + list(elem.iter('LEDGERENTRIES.LIST')):
+            entry_amount = _text(entry, 'AMOUNT')
+            if entry_amount is None:
+                continue
+            if amount is None or _text(entry, 'LEDGERNAME') == party:
+                amount = pd.to_numeric(entry_amount.replace(',', ''), errors='coerce')
+            if _text(entry, 'LEDGERNAME') == party:
+                break
+
+        rows.append({
+            'Date': pd.to_datetime(_text(elem, 'DATE'), format='%Y%m%d', errors='coerce'),
+            'Particulars': party or _text(elem, 'LEDGERNAME'),
+            'Vch Type': elem.get('VCHTYPE') or _text(elem, 'VOUCHERTYPENAME'),
+            'Vch No.': _text(elem, 'VOUCHERNUMBER'),
+            'Debit': -amount if amount is not None and amount < 0 else None,
+            'Credit': amount if amount is not None and amount > 0 else None,
+            'Notes': _text(elem, 'NARRATION'),
+        })
+        if open_elems:
+            open_elems[-1].remove(elem)
+
+    df = pd.DataFrame(rows, columns=TALLY_XML_COLUMNS)
+    df['Debit'] = pd.to_numeric(df['Debit'], errors='coerce')
+    df['Credit'] = pd.to_numeric(df['Credit'], errors='coerce')
+    return df
+
+
+def parquet_safe(df):
+    """Copy of df that Parquet can store: object columns as text, with gaps left as nulls"""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            # Parquet needs one type per column; keep text as text and gaps as nulls
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def _apply_dtypes(df, dtype):
+    """Cast the declared columns one by one, leaving any that don't fit as parsed"""
+    for col, col_dtype in (dtype or {}).items():
+        if col not in df.columns:
+            continue
+        if col_dtype == 'float64':
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        else:
+            try:
+                df[col] = df[col].astype(col_dtype)
+            except (ValueError, TypeError):
+                pass
+    return df
+
+
+def _text(elem, tag):
+    child = elem.find(tag)
+    if child is None or child.text is None:
+        return None
+    return child.text.strip()
+
+
+def _peek(file, size):
+    if hasattr(file, 'read'):
+        position = file.tell()
+        head = file.read(size)
+        file.seek(position)
+        return head
+    with open(file, 'rb') as handle:
+        return handle.read(size)
+
+
+def _rewind(file):
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return file
@@ -0,0 +1,165 @@
+# gst_library.py
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from gst_reference import GSTReference
+
+
+class GSTLibrary:
+    """Server-side store of indexed GST 2A/2B data, one directory per period.
+
+    An admin saves a period once from a GSTReference (SMSTallyAutomation.load_gst_reference);
+    its sorted amount arrays (and invoice keys, when the files had them) are written
+    as uncompressed Arrow files, which load() memory-maps read-only, so every
+    session and worker process shares the page cache instead of parsing the
+    workbooks again. load() is thread-safe and keeps
+    one reference per period until that period is saved again.
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, directory="gst_library"):
+        self.directory = directory
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def periods(self):
+        """Saved periods, newest name first"""
+        return sorted(
+            (name for name in os.listdir(self.directory)
+             if not name.startswith('.') and os.path.exists(os.path.join(self.directory, name, self.MANIFEST))),
+            reverse=True
+        )
+
+    def describe(self, period):
+        """The period's manifest: source files, years and when it was saved"""
+        with open(os.path.join(self._period_dir(period), self.MANIFEST)) as handle:
+            return json.load(handle)
+
+    def save_period(self, period, gst_reference):
+        """Store a GSTReference under period, replacing any previous version"""
+        target = self._period_dir(period)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.directory)
+        try:
+            manifest = {'period': period, 'saved_at': datetime.now().isoformat(timespec='seconds'),
+                        'sources': list(gst_reference.sources), 'files': []}
+            for position, gst_data in enumerate(gst_reference.files):
+                years = sorted(gst_data['amounts_by_year'])
+                by_year = [gst_data['amounts_by_year'][year] for year in years]
+                invoice_nos_by_year = [gst_reference.file_invoice_nos(gst_data, year) for year in years]
+                self._write(os.path.join(staging, f'{position}-all.arrow'), {
+                    'amount': gst_data['amounts'],
+                    'invoice_no': gst_reference.file_invoice_nos(gst_data),
+                })
+                self._write(os.path.join(staging, f'{position}-by-year.arrow'), {
+                    'year': np.repeat(np.array(years, dtype='int64'), [len(amounts) for amounts in by_year]),
+                    'amount': np.concatenate(by_year) if by_year else np.empty(0),
+                    'invoice_no': np.concatenate(invoice_nos_by_year) if by_year else np.empty(0, dtype=object),
+                })
+                invoices = gst_data.get('invoices')
+                if invoices is not None:
+                    self._write(os.path.join(staging, f'{position}-invoices.arrow'), {
+                        'invoice_key': invoices['invoice_key'].to_numpy(dtype=object),
+                        'invoice_no': invoices['invoice_no'].to_numpy(dtype=object),
+                        'gstin': invoices['gstin'].to_numpy(dtype=object),
+                        'amount': invoices['amount'].to_numpy(dtype='float64'),
+                        'year': invoices['year'].to_numpy(dtype='float64'),
+                    })
+                manifest['files'].append({'years': sorted(gst_data['years']), 'has_years': gst_data['has_years'],
+                                          'invoices': invoices is not None})
+            with open(os.path.join(staging, self.MANIFEST), 'w') as handle:
+                json.dump(manifest, handle, indent=2)
+
+            with self._lock:
+                # Swap directories so readers never see a half-written period
+                retired = None
+                if os.path.exists(target):
+                    retired = tempfile.mkdtemp(prefix='.retired-', dir=self.directory)
+                    os.replace(target, os.path.join(retired, 'period'))
+                os.replace(staging, target)
+                self._loaded.pop(period, None)
+            if retired:
+                shutil.rmtree(retired, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    def delete_period(self, period):
+        with self._lock:
+            self._loaded.pop(period, None)
+            shutil.rmtree(self._period_dir(period), ignore_errors=True)
+
+    def load(self, period):
+        """Return the period's GSTReference, memory-mapping its files on first use"""
+        # The manifest's mtime tells whether another process has saved the period since
+        version = os.stat(os.path.join(self._period_dir(period), self.MANIFEST)).st_mtime_ns
+        with self._lock:
+            cached = self._loaded.get(period)
+            if cached is None or cached[0] != version:
+                cached = (version, self._open(period))
+                self._loaded[period] = cached
+            return cached[1]
+
+    def _open(self, period):
+        path = self._period_dir(period)
+        manifest = self.describe(period)
+        gst_data_list = []
+        for position, info in enumerate(manifest['files']):
+            overall = feather.read_table(os.path.join(path, f'{position}-all.arrow'), memory_map=True)
+            amounts = self._to_numpy(overall.column('amount'))
+            by_year = feather.read_table(os.path.join(path, f'{position}-by-year.arrow'), memory_map=True)
+            years = self._to_numpy(by_year.column('year'))
+            year_amounts = self._to_numpy(by_year.column('amount'))
+            # Invoice numbers are text, so they are copied out; periods saved before they were kept have none
+            invoice_nos = self._to_numpy(overall.column('invoice_no')) if 'invoice_no' in overall.column_names else None
+            year_invoice_nos = self._to_numpy(by_year.column('invoice_no')) if invoice_nos is not None else None
+
+            # Rows are grouped by year, so each year's amounts are a slice of the mapped column
+            amounts_by_year, invoice_nos_by_year = {}, {}
+            for year in info['years']:
+                start, end = np.searchsorted(years, [year, year + 1])
+                amounts_by_year[year] = year_amounts[start:end]
+                if year_invoice_nos is not None:
+                    invoice_nos_by_year[year] = year_invoice_nos[start:end]
+            # Invoice keys are only read back for keyed verification, as a plain frame
+            invoices = None
+            if info.get('invoices'):
+                invoices = feather.read_table(os.path.join(path, f'{position}-invoices.arrow'),
+                                              memory_map=True).to_pandas()
+            gst_data_list.append({
+                'amounts': amounts,
+                'amounts_by_year': amounts_by_year,
+                'invoice_nos': invoice_nos,
+                'invoice_nos_by_year': invoice_nos_by_year if invoice_nos is not None else None,
+                'years': set(info['years']),
+                'has_years': info['has_years'],
+                'invoices': invoices,
+            })
+        return GSTReference(gst_data_list, sources=manifest['sources'])
+
+    def _period_dir(self, period):
+        # Periods become directory names, so keep them to plain characters
+        if not re.fullmatch(r'[\w][\w .-]*', str(period)):
+            raise ValueError(f"Invalid GST period name '{period}'")
+        return os.path.join(self.directory, str(period))
+
+    def _write(self, path, columns):
+        table = pa.table({name: pa.array(values) for name, values in columns.items()})
+        feather.write_feather(table, path, compression='uncompressed')
+
+    def _to_numpy(self, column):
+        if column.num_chunks == 1:
+            # Null-free numeric chunks convert without copying, keeping the mapping
+            return column.chunk(0).to_numpy(zero_copy_only=False)
+        return column.to_numpy()
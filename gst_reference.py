@@ -0,0 +1,112 @@
+# gst_reference.py
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class GSTReference:
+    """GST invoice amounts from a set of 2A/2B files, loaded and indexed once.
+
+    Built by SMSTallyAutomation.load_gst_reference and queried by
+    check_gst_for_service_claims, so the SMS and Tally ledgers (and later reruns)
+    share one parse of the GST files. Only the sorted amount arrays with their
+    invoice numbers (and the invoice number / GSTIN table used by keyed
+    verification) are kept, not the GST frames themselves.
+    """
+
+    # Entries of each preprocess_gst_data dict that the reference keeps
+    KEYS = ('amounts', 'amounts_by_year', 'invoice_nos', 'invoice_nos_by_year', 'years', 'has_years', 'invoices')
+
+    def __init__(self, gst_data_list, sources=()):
+        self.files = [{key: gst_data.get(key) for key in self.KEYS} for gst_data in gst_data_list]
+        # Names of the files the reference was built from, for display
+        self.sources = list(sources)
+        self._by_year = {}
+        self._invoices = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.files)
+
+    def match_amounts(self, amounts, years, tolerance):
+        """For each (amount, year) claim, the nearest GST invoice within tolerance.
+
+        Per file, a claim searches that year's invoices when the file has any rows for
+        the year and every invoice otherwise (as check_cached_gst_data). Claims are
+        grouped by year and each group is resolved with one nearest-amount as-of join
+        against that year's merged invoices.
+
+        Returns (found, invoice_nos): a boolean array, and the matched invoice's
+        number (None when unmatched or the file has no invoice number column).
+        """
+        claims = pd.DataFrame({
+            'amount': np.asarray(amounts, dtype='float64'),
+            'year': np.asarray(years, dtype='float64'),
+            'claim': np.arange(len(amounts)),
+        })
+        found = np.zeros(len(claims), dtype=bool)
+        invoice_nos = np.full(len(claims), None, dtype=object)
+        for year, group in claims.groupby('year', sort=False):
+            invoices = self.invoices_for_year(int(year))
+            if invoices.empty:
+                continue
+            matched = pd.merge_asof(group.sort_values('amount'), invoices, on='amount',
+                                    direction='nearest', tolerance=tolerance)
+            matched = matched[matched['gst_amount'].notna()]
+            found[matched['claim'].to_numpy()] = True
+            invoice_nos[matched['claim'].to_numpy()] = matched['invoice_no'].to_numpy(dtype=object)
+        return found, invoice_nos
+
+    def invoices_for_year(self, year):
+        """Invoices a claim dated in year is compared with, sorted by amount, built once per year"""
+        with self._lock:
+            if year not in self._by_year:
+                amounts, invoice_nos = [], []
+                for gst_data in self.files:
+                    if gst_data['has_years'] and year in gst_data['years']:
+                        amounts.append(gst_data['amounts_by_year'].get(year, np.empty(0)))
+                        invoice_nos.append(self.file_invoice_nos(gst_data, year))
+                    else:
+                        amounts.append(gst_data['amounts'])
+                        invoice_nos.append(self.file_invoice_nos(gst_data))
+                amounts = np.concatenate(amounts) if amounts else np.empty(0)
+                order = np.argsort(amounts, kind='stable')
+                self._by_year[year] = pd.DataFrame({
+                    'amount': amounts[order],
+                    'gst_amount': amounts[order],
+                    'invoice_no': np.concatenate(invoice_nos)[order] if invoice_nos else np.empty(0, dtype=object),
+                })
+            return self._by_year[year]
+
+    def invoices(self):
+        """Invoice number / GSTIN keys of every file in one frame (invoice_key, invoice_no,
+        gstin, amount, year), for keyed verification; empty when no file has them"""
+        with self._lock:
+            if self._invoices is None:
+                tables = [gst_data['invoices'] for gst_data in self.files if gst_data['invoices'] is not None]
+                self._invoices = (pd.concat(tables, ignore_index=True) if tables else
+                                  pd.DataFrame(columns=['invoice_key', 'invoice_no', 'gstin', 'amount', 'year']))
+            return self._invoices
+
+    def file_invoice_nos(self, gst_data, year=None):
+        """Invoice numbers in the same order as the file's amounts (or that year's amounts)"""
+        if year is None:
+            invoice_nos, size = gst_data['invoice_nos'], len(gst_data['amounts'])
+        else:
+            invoice_nos = (gst_data['invoice_nos_by_year'] or {}).get(year)
+            size = len(gst_data['amounts_by_year'].get(year, ()))
+        if invoice_nos is None:
+            return np.full(size, None, dtype=object)
+        return np.asarray(invoice_nos, dtype=object)
+
+    @staticmethod
+    def within(sorted_amounts, amounts, tolerance):
+        """Whether each amount has a sorted_amounts neighbour within tolerance"""
+        if not len(sorted_amounts):
+            return np.zeros(len(amounts), dtype=bool)
+        # The closest value is one of the two around the insertion point
+        pos = np.searchsorted(sorted_amounts, amounts)
+        below = sorted_amounts[np.clip(pos - 1, 0, len(sorted_amounts) - 1)]
+        above = sorted_amounts[np.clip(pos, 0, len(sorted_amounts) - 1)]
+        return (np.abs(below - amounts) <= tolerance) | (np.abs(above - amounts) <= tolerance)
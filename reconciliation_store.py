@@ -0,0 +1,201 @@
+# reconciliation_store.py
+import json
+import os
+import sqlite3
+from datetime import datetime
+from io import StringIO
+
+import pandas as pd
+
+
+class ReconciliationStore:
+    """Local SQLite store for reconciliation runs.
+
+    Every saved run keeps the full processed SMS/Tally frames (so the app can reload
+    it without re-running anything), one indexed row per transaction for SQL
+    queries, and the match pairs with the tier that produced them.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            label TEXT,
+            settings TEXT,
+            sms_frame TEXT NOT NULL,
+            tally_frame TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS transactions (
+            run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+            side TEXT NOT NULL,
+            row_index INTEGER NOT NULL,
+            status TEXT,
+            direction TEXT,
+            amount REAL,
+            date TEXT,
+            transaction_type TEXT,
+            reference TEXT,
+            gst_status TEXT,
+            PRIMARY KEY (run_id, side, row_index)
+        );
+        CREATE INDEX IF NOT EXISTS idx_transactions_open
+            ON transactions (run_id, side, status, direction, amount, date);
+        CREATE TABLE IF NOT EXISTS match_pairs (
+            run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+            sms_index INTEGER NOT NULL,
+            tally_index INTEGER NOT NULL,
+            tier TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_match_pairs_run ON match_pairs (run_id, sms_index, tally_index);
+    """
+
+    # Per side: (date column, reference column) in the processed frames
+    SIDES = {
+        'sms': ('TransactionDate', 'Description'),
+        'tally': ('Date', 'Vch No.'),
+    }
+
+    def __init__(self, path="reconciliation.db"):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def save_run(self, sms_df, tally_df, match_pairs=(), settings=None, label=None):
+        """Persist a finished run and return its run_id.
+
+        match_pairs takes SMSTallyAutomation.match_pairs; rows are stored by position.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (created_at, label, settings, sms_frame, tally_frame) VALUES (?, ?, ?, ?, ?)",
+                (datetime.now().isoformat(timespec='seconds'), label, json.dumps(settings or {}),
+                 self._frame_to_json(sms_df), self._frame_to_json(tally_df))
+            )
+            run_id = cursor.lastrowid
+
+            for side, df in (('sms', sms_df), ('tally', tally_df)):
+                conn.executemany(
+                    "INSERT INTO transactions (run_id, side, row_index, status, direction, amount, date, "
+                    "transaction_type, reference, gst_status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._transaction_rows(run_id, side, df)
+                )
+
+            # Pairs arrive as index labels; rows are stored by position like the saved frames
+            conn.executemany(
+                "INSERT INTO match_pairs (run_id, sms_index, tally_index, tier) VALUES (?, ?, ?, ?)",
+                [(run_id, int(sms_df.index.get_loc(sms_index)), int(tally_df.index.get_loc(tally_index)), tier)
+                 for sms_index, tally_index, tier in match_pairs]
+            )
+        return run_id
+
+    def list_runs(self):
+        """Return saved runs, newest first, as a DataFrame"""
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                "SELECT run_id, created_at, label, settings FROM runs ORDER BY run_id DESC", conn
+            )
+
+    def load_run(self, run_id):
+        """Return (sms_df, tally_df) exactly as they were saved"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT sms_frame, tally_frame FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No reconciliation run with id {run_id}")
+        return self._frame_from_json(row[0]), self._frame_from_json(row[1])
+
+    def delete_run(self, run_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def match_pairs(self, run_id):
+        """Return the (sms_index, tally_index, tier) pairs of a run"""
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                "SELECT sms_index, tally_index, tier FROM match_pairs WHERE run_id = ? ORDER BY tally_index, sms_index",
+                conn, params=(run_id,)
+            )
+
+    def open_items(self, run_id, side, direction=None, amount=None, tolerance=0.0, start_date=None, end_date=None):
+        """Return the unmatched rows of one side, optionally narrowed by direction,
+        amount (within tolerance) and date range. Served by idx_transactions_open."""
+        if side not in self.SIDES:
+            raise ValueError(f"Unknown side '{side}', expected one of {tuple(self.SIDES)}")
+
+        query = "SELECT * FROM transactions WHERE run_id = ? AND side = ? AND status = 'Not Tallied'"
+        params = [run_id, side]
+        if direction is not None:
+            query += " AND direction = ?"
+            params.append(direction)
+        if amount is not None:
+            query += " AND amount BETWEEN ? AND ?"
+            params.extend([amount - tolerance, amount + tolerance])
+        if start_date is not None:
+            query += " AND date >= ?"
+            params.append(pd.Timestamp(start_date).isoformat())
+        if end_date is not None:
+            query += " AND date <= ?"
+            params.append(pd.Timestamp(end_date).isoformat())
+
+        with self._connect() as conn:
+            return pd.read_sql_query(query + " ORDER BY date, row_index", conn, params=params)
+
+    def summary_stats(self, run_id):
+        """Same figures as SMSTallyAutomation.get_summary_stats, computed in SQL"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT side, COUNT(*), SUM(status = 'Tallied'), "
+                "COALESCE(SUM(CASE WHEN status = 'Tallied' THEN amount END), 0), COALESCE(SUM(amount), 0) "
+                "FROM transactions WHERE run_id = ? GROUP BY side",
+                (run_id,)
+            ).fetchall()
+
+        totals = {side: (0, 0, 0.0, 0.0) for side in self.SIDES}
+        for side, count, matched, matched_sum, total_sum in rows:
+            totals[side] = (count, matched or 0, matched_sum, total_sum)
+
+        sms_count, sms_matched, sms_matched_sum, sms_total_sum = totals['sms']
+        tally_count, tally_matched, tally_matched_sum, tally_total_sum = totals['tally']
+        return {
+            'matched_sms_count': sms_matched,
+            'matched_tally_count': tally_matched,
+            'unmatched_sms_count': sms_count - sms_matched,
+            'unmatched_tally_count': tally_count - tally_matched,
+            'matched_sms_sum': sms_matched_sum,
+            'matched_tally_sum': tally_matched_sum,
+            'total_sms_sum': sms_total_sum,
+            'total_tally_sum': tally_total_sum,
+        }
+
+    def _transaction_rows(self, run_id, side, df):
+        date_col, reference_col = self.SIDES[side]
+        dates = pd.to_datetime(df[date_col], errors='coerce') if date_col in df.columns else pd.Series(pd.NaT, index=df.index)
+        amounts = pd.to_numeric(df['Amount'], errors='coerce') if 'Amount' in df.columns else pd.Series(float('nan'), index=df.index)
+
+        def column(name):
+            if name in df.columns:
+                return [None if pd.isna(value) else str(value) for value in df[name]]
+            return [None] * len(df)
+
+        return zip(
+            [run_id] * len(df), [side] * len(df), range(len(df)),
+            column('Status'), column('TransactionDirection'),
+            [None if pd.isna(value) else float(value) for value in amounts],
+            [None if pd.isna(value) else value.isoformat() for value in dates],
+            column('Transaction Type'), column(reference_col), column('GST Status'),
+        )
+
+    def _frame_to_json(self, df):
+        return df.reset_index(drop=True).to_json(orient='table', date_format='iso', index=True)
+
+    def _frame_from_json(self, payload):
+        # Keep text columns Arrow-backed like the processed frames that were saved
+        with pd.option_context('mode.string_storage', 'pyarrow'):
+            return pd.read_json(StringIO(payload), orient='table')
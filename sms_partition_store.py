@@ -0,0 +1,109 @@
+# sms_partition_store.py
+import os
+import shutil
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from file_readers import parquet_safe
+
+
+class SMSPartitionStore:
+    """Processed SMS rows spilled to Parquet, one directory per transaction month.
+
+    Rows keep a stable id across chunks (the `_row` column, restored as the index on
+    read), so matching results can be written back to the partition they came from.
+    Rows without a usable date go to the 'undated' partition.
+    """
+
+    UNDATED = 'undated'
+    ROW_ID = '_row'
+
+    def __init__(self, directory="sms_partitions"):
+        self.directory = directory
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        # Row ids are handed out consecutively, so the next id is the stored row count
+        self.row_count = sum(pq.ParquetFile(path).metadata.num_rows for path in self._part_paths())
+
+    def clear(self):
+        """Drop every partition"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory)
+        self.row_count = 0
+
+    def append(self, df):
+        """Spill one processed chunk, split by month; returns the ids given to its rows"""
+        df = df.copy()
+        df.index = pd.RangeIndex(self.row_count, self.row_count + len(df))
+        self.row_count += len(df)
+
+        for month, part in df.groupby(self.month_keys(df), sort=False):
+            path = self._partition_dir(month)
+            if not os.path.exists(path):
+                os.makedirs(path)
+            part_path = os.path.join(path, 'part-{:08d}.parquet'.format(int(part.index[0])))
+            self._to_parquet(part, part_path)
+        return df.index
+
+    def months(self):
+        """Partition keys present in the store, oldest first ('undated' last)"""
+        months = [name[len('month='):] for name in os.listdir(self.directory) if name.startswith('month=')]
+        return sorted(months, key=lambda month: (month == self.UNDATED, month))
+
+    def months_between(self, start_date, end_date):
+        """Dated partitions that can hold rows between start_date and end_date"""
+        first = pd.Timestamp(start_date).strftime('%Y-%m')
+        last = pd.Timestamp(end_date).strftime('%Y-%m')
+        return [month for month in self.months() if month != self.UNDATED and first <= month <= last]
+
+    def read(self, months):
+        """Return the rows of the given partitions, indexed by row id"""
+        frames = [self._read_partition(month) for month in months]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames).sort_index()
+
+    def read_all(self):
+        return self.read(self.months())
+
+    def write(self, month, df):
+        """Replace one partition with df (e.g. after matching updated its statuses)"""
+        path = self._partition_dir(month)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        if len(df):
+            self._to_parquet(df, os.path.join(path, 'part-{:08d}.parquet'.format(int(df.index.min()))))
+
+    def month_keys(self, df):
+        """Partition key of every row of a processed SMS frame"""
+        dates = pd.to_datetime(df['TransactionDate'], errors='coerce')
+        return dates.dt.strftime('%Y-%m').fillna(self.UNDATED)
+
+    def _partition_dir(self, month):
+        return os.path.join(self.directory, 'month={}'.format(month))
+
+    def _part_paths(self):
+        for month in self.months():
+            path = self._partition_dir(month)
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.parquet'):
+                    yield os.path.join(path, name)
+
+    def _read_partition(self, month):
+        path = self._partition_dir(month)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        frames = [pd.read_parquet(os.path.join(path, name))
+                  for name in sorted(os.listdir(path)) if name.endswith('.parquet')]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames).set_index(self.ROW_ID)
+        df.index.name = None
+        return df
+
+    def _to_parquet(self, df, path):
+        df = parquet_safe(df)
+        df[self.ROW_ID] = df.index
+        df.reset_index(drop=True).to_parquet(path, index=False)
@@ -0,0 +1,70 @@
+# upload_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ParsedUploadCache:
+    """In-memory LRU cache of parsed uploads, keyed by the file's content hash.
+
+    Keys also carry the kind of parse and the processing version, so a change to
+    the processing code never serves frames built by the old code. Entries are
+    evicted least-recently-used first once their total size passes the budget.
+    """
+
+    def __init__(self, max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_parse(self, file, kind, parse, version=None):
+        """Return a copy of the cached frame for file, parsing it with parse(file) on a miss.
+
+        Callers always get their own copy, so edits never reach the cached frame.
+        """
+        key = (self.content_hash(file), kind, version)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0].copy()
+
+        df = parse(file)
+        size = int(df.memory_usage(deep=True).sum())
+
+        with self._lock:
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (df, size)
+                self.current_bytes += size
+                while self.current_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self.current_bytes -= evicted_size
+        return df.copy()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def content_hash(file):
+        """SHA-256 of an upload's bytes (Streamlit upload, file object or path)"""
+        digest = hashlib.sha256()
+        if hasattr(file, 'getvalue'):
+            digest.update(file.getvalue())
+        elif hasattr(file, 'read'):
+            position = file.tell()
+            file.seek(0)
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+            file.seek(position)
+        else:
+            with open(file, 'rb') as handle:
+                for chunk in iter(lambda: handle.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        return digest.hexdigest()
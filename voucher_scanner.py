@@ -0,0 +1,66 @@
+# voucher_scanner.py
+from collections import deque
+
+
+class VoucherScanner:
+    """Aho-Corasick automaton that finds many voucher numbers in one pass over a text.
+
+    Looking up which SMS lines mention which Tally vouchers pair by pair costs one
+    substring search per (SMS, Tally) pair; the automaton reads each SMS text once
+    and reports every voucher number it contains.
+    """
+
+    def __init__(self, patterns):
+        # Empty patterns would match every text, so they are left to the caller
+        self.patterns = list(dict.fromkeys(str(p) for p in patterns if p is not None and str(p)))
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(pattern_id)
+
+        # Breadth-first pass to wire failure links and merge outputs along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def scan(self, text):
+        """Return the set of pattern ids that occur anywhere in text"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def scan_many(self, texts):
+        """Map each pattern to the positions of the texts that contain it"""
+        hits = {pattern: set() for pattern in self.patterns}
+        for position, text in enumerate(texts):
+            for pattern_id in self.scan(text):
+                hits[self.patterns[pattern_id]].add(position)
+        return hits